@@ -1,4 +1,5 @@
 from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
 
 from app.schemas.status import ProxyStatus
 from app.utils.proxies import get_proxy_list
@@ -8,6 +9,9 @@ router = APIRouter()
 
 
 @router.get("/proxies", response_model=ProxyStatus, response_model_exclude_none=True)
-def get_proxy_status() -> ProxyStatus:
+def get_proxy_status() -> ORJSONResponse:
     proxies = get_proxy_list()
-    return ProxyStatus(enabled=bool(proxies), count=len(proxies))
+    # Returned directly so FastAPI skips re-validating and re-encoding the model; the dump keeps the
+    # response_model_exclude_none output.
+    status = ProxyStatus(enabled=bool(proxies), count=len(proxies))
+    return ORJSONResponse(status.model_dump(mode="json", by_alias=True, exclude_none=True))
@@ -1,5 +1,6 @@
 import uvicorn
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
@@ -18,6 +19,8 @@ app = FastAPI(title="Transfermarkt API")
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 app.add_middleware(SlowAPIMiddleware)
+# Clients such as requests send Accept-Encoding: gzip by default; repeated JSON keys compress well.
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 app.include_router(api_router)
 
 
@@ -1,4 +1,5 @@
 from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import Optional
 from xml.etree import ElementTree
 
@@ -7,13 +8,55 @@ from bs4 import BeautifulSoup
 from fastapi import HTTPException
 from lxml import etree
 from requests import Response, TooManyRedirects
+from requests.adapters import HTTPAdapter
 from requests.exceptions import ConnectionError as RequestsConnectionError, ProxyError
 
-from app.utils.proxies import get_next_proxy, get_proxy_list
+from app.utils.proxies import get_next_proxy, get_proxy_list, mark_proxy_dead
 from app.utils.utils import trim
 from app.utils.xpath import Pagination
 
 
+HTTP_POOL_MAXSIZE = 50
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/113.0.0.0 "
+    "Safari/537.36"
+)
+
+
+def _build_session() -> requests.Session:
+    """
+    Build the HTTP session shared by every scraper so connections to Transfermarkt are kept alive and reused.
+
+    Returns:
+        requests.Session: A session with a connection pool sized for concurrent scraping.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_MAXSIZE, pool_maxsize=HTTP_POOL_MAXSIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+_session = _build_session()
+
+
+@lru_cache(maxsize=None)
+def compile_xpath(xpath: str) -> etree.XPath:
+    """
+    Compile an XPath expression once and reuse it for every subsequent evaluation.
+
+    Args:
+        xpath (str): The XPath expression to compile.
+
+    Returns:
+        etree.XPath: The compiled XPath expression, callable with an element or tree.
+    """
+    return etree.XPath(xpath)
+
+
 @dataclass
 class TransfermarktBase:
     """
@@ -54,23 +97,13 @@ class TransfermarktBase:
             proxy = get_next_proxy() if proxies else None
             proxy_map = {"http": proxy, "https": proxy} if proxy else None
             try:
-                response = requests.get(
-                    url=url,
-                    headers={
-                        "User-Agent": (
-                            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                            "AppleWebKit/537.36 (KHTML, like Gecko) "
-                            "Chrome/113.0.0.0 "
-                            "Safari/537.36"
-                        ),
-                    },
-                    proxies=proxy_map,
-                )
+                response = _session.get(url=url, proxies=proxy_map)
                 break
             except TooManyRedirects:
                 raise HTTPException(status_code=404, detail=f"Not found for url: {url}")
             except (ProxyError, RequestsConnectionError) as exc:
                 last_error = exc
+                mark_proxy_dead(proxy)
                 continue
             except Exception as exc:
                 raise HTTPException(status_code=500, detail=f"Error for url: {url}. {exc}")
@@ -120,7 +153,10 @@ class TransfermarktBase:
 
     def request_url_page(self, url: Optional[str] = None) -> ElementTree:
         """
-        Fetch the web page content, parse it using BeautifulSoup, and convert it to an ElementTree.
+        Fetch the web page content and parse it directly into an ElementTree with lxml.
+
+        The raw response bytes are handed to libxml2's HTML parser, avoiding the BeautifulSoup
+        parse and re-serialisation round trip.
 
         Returns:
             ElementTree: An ElementTree representing the parsed web page content for further
@@ -130,8 +166,8 @@ class TransfermarktBase:
             HTTPException: If there are too many redirects, or if the server returns a client or
                 server error status code.
         """
-        bsoup: BeautifulSoup = self.request_url_bsoup(url=url)
-        return self.convert_bsoup_to_page(bsoup=bsoup)
+        response: Response = self.make_request(url=url)
+        return etree.HTML(response.content)
 
     def raise_exception_if_not_found(self, xpath: str):
         """
@@ -159,7 +195,7 @@ class TransfermarktBase:
             Optional[list]: A list of elements extracted from the web page based on the XPath query.
                 If remove_empty is True, empty or whitespace-only elements are filtered out.
         """
-        elements: list = self.page.xpath(xpath)
+        elements: list = compile_xpath(xpath)(self.page)
         if remove_empty:
             elements_valid: list = [trim(e) for e in elements if trim(e)]
         else:
@@ -194,7 +230,7 @@ class TransfermarktBase:
             Optional[str]: The extracted text content from the web page based on the XPath query and
                 optional parameters. If no matching element is found, None is returned.
         """
-        element = self.page.xpath(xpath)
+        element = compile_xpath(xpath)(self.page)
 
         if not element:
             return None
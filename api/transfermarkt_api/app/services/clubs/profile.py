@@ -45,62 +45,72 @@ class TransfermarktClubProfile(TransfermarktBase):
                 return value
             return default
 
-        self.response["id"] = self.club_id
-        self.response["url"] = text_or_default(Clubs.Profile.URL)
-        self.response["name"] = text_or_default(Clubs.Profile.NAME)
-        self.response["officialName"] = text_or_default(Clubs.Profile.NAME_OFFICIAL)
         image_raw = self.get_text_by_xpath(Clubs.Profile.IMAGE)
-        image_parts = safe_split(image_raw, "?") or []
-        self.response["image"] = image_parts[0] if image_parts else image_raw or ""
-        self.response["legalForm"] = self.get_text_by_xpath(Clubs.Profile.LEGAL_FORM)
-        self.response["addressLine1"] = text_or_default(Clubs.Profile.ADDRESS_LINE_1)
-        self.response["addressLine2"] = self.get_text_by_xpath(Clubs.Profile.ADDRESS_LINE_2)
-        self.response["addressLine3"] = self.get_text_by_xpath(Clubs.Profile.ADDRESS_LINE_3)
-        self.response["tel"] = self.get_text_by_xpath(Clubs.Profile.TEL)
-        self.response["fax"] = self.get_text_by_xpath(Clubs.Profile.FAX)
-        self.response["website"] = self.get_text_by_xpath(Clubs.Profile.WEBSITE)
-        self.response["foundedOn"] = self.get_text_by_xpath(Clubs.Profile.FOUNDED_ON)
-        self.response["members"] = self.get_text_by_xpath(Clubs.Profile.MEMBERS)
-        self.response["membersDate"] = safe_regex(
-            self.get_text_by_xpath(Clubs.Profile.MEMBERS_DATE),
-            REGEX_MEMBERS_DATE,
-            "date",
-        )
-        self.response["otherSports"] = safe_split(self.get_text_by_xpath(Clubs.Profile.OTHER_SPORTS), ",")
-        self.response["colors"] = [
-            safe_regex(color, REGEX_BG_COLOR, "color")
-            for color in self.get_list_by_xpath(Clubs.Profile.COLORS)
-            if "#" in color
-        ]
-        self.response["stadiumName"] = text_or_default(Clubs.Profile.STADIUM_NAME)
         stadium_seats = remove_str(self.get_text_by_xpath(Clubs.Profile.STADIUM_SEATS), ["Seats", "."])
-        self.response["stadiumSeats"] = numeric_or_default(stadium_seats)
         transfer_record = self.get_text_by_xpath(Clubs.Profile.TRANSFER_RECORD)
-        self.response["currentTransferRecord"] = numeric_or_default(transfer_record)
-        self.response["currentMarketValue"] = self.get_text_by_xpath(
-            Clubs.Profile.MARKET_VALUE,
-            iloc_to=3,
-            join_str="",
+
+        self.response.update(
+            {
+                "id": self.club_id,
+                "url": text_or_default(Clubs.Profile.URL),
+                "name": text_or_default(Clubs.Profile.NAME),
+                "officialName": text_or_default(Clubs.Profile.NAME_OFFICIAL),
+                "image": image_raw.partition("?")[0] if image_raw else "",
+                "legalForm": self.get_text_by_xpath(Clubs.Profile.LEGAL_FORM),
+                "addressLine1": text_or_default(Clubs.Profile.ADDRESS_LINE_1),
+                "addressLine2": self.get_text_by_xpath(Clubs.Profile.ADDRESS_LINE_2),
+                "addressLine3": self.get_text_by_xpath(Clubs.Profile.ADDRESS_LINE_3),
+                "tel": self.get_text_by_xpath(Clubs.Profile.TEL),
+                "fax": self.get_text_by_xpath(Clubs.Profile.FAX),
+                "website": self.get_text_by_xpath(Clubs.Profile.WEBSITE),
+                "foundedOn": self.get_text_by_xpath(Clubs.Profile.FOUNDED_ON),
+                "members": self.get_text_by_xpath(Clubs.Profile.MEMBERS),
+                "membersDate": safe_regex(
+                    self.get_text_by_xpath(Clubs.Profile.MEMBERS_DATE),
+                    REGEX_MEMBERS_DATE,
+                    "date",
+                ),
+                "otherSports": safe_split(self.get_text_by_xpath(Clubs.Profile.OTHER_SPORTS), ","),
+                "colors": [
+                    safe_regex(color, REGEX_BG_COLOR, "color")
+                    for color in self.get_list_by_xpath(Clubs.Profile.COLORS)
+                    if "#" in color
+                ],
+                "stadiumName": text_or_default(Clubs.Profile.STADIUM_NAME),
+                "stadiumSeats": numeric_or_default(stadium_seats),
+                "currentTransferRecord": numeric_or_default(transfer_record),
+                "currentMarketValue": self.get_text_by_xpath(
+                    Clubs.Profile.MARKET_VALUE,
+                    iloc_to=3,
+                    join_str="",
+                ),
+                "confederation": self.get_text_by_xpath(Clubs.Profile.CONFEDERATION),
+                "fifaWorldRanking": remove_str(self.get_text_by_xpath(Clubs.Profile.RANKING), "Pos"),
+                "squad": {
+                    "size": numeric_or_default(self.get_text_by_xpath(Clubs.Profile.SQUAD_SIZE)),
+                    "averageAge": numeric_or_default(self.get_text_by_xpath(Clubs.Profile.SQUAD_AVG_AGE)),
+                    "foreigners": numeric_or_default(self.get_text_by_xpath(Clubs.Profile.SQUAD_FOREIGNERS)),
+                    "nationalTeamPlayers": numeric_or_default(
+                        self.get_text_by_xpath(Clubs.Profile.SQUAD_NATIONAL_PLAYERS),
+                    ),
+                },
+                "league": {
+                    "id": extract_from_url(self.get_text_by_xpath(Clubs.Profile.LEAGUE_ID)),
+                    "name": self.get_text_by_xpath(Clubs.Profile.LEAGUE_NAME),
+                    "countryId": safe_regex(
+                        self.get_text_by_xpath(Clubs.Profile.LEAGUE_COUNTRY_ID),
+                        REGEX_COUNTRY_ID,
+                        "id",
+                    ),
+                    "countryName": self.get_text_by_xpath(Clubs.Profile.LEAGUE_COUNTRY_NAME),
+                    "tier": self.get_text_by_xpath(Clubs.Profile.LEAGUE_TIER),
+                },
+                "historicalCrests": [
+                    crest.partition("?")[0]
+                    for crest in self.get_list_by_xpath(Clubs.Profile.CRESTS_HISTORICAL)
+                    if crest
+                ],
+            },
         )
-        self.response["confederation"] = self.get_text_by_xpath(Clubs.Profile.CONFEDERATION)
-        self.response["fifaWorldRanking"] = remove_str(self.get_text_by_xpath(Clubs.Profile.RANKING), "Pos")
-        self.response["squad"] = {
-            "size": numeric_or_default(self.get_text_by_xpath(Clubs.Profile.SQUAD_SIZE)),
-            "averageAge": numeric_or_default(self.get_text_by_xpath(Clubs.Profile.SQUAD_AVG_AGE)),
-            "foreigners": numeric_or_default(self.get_text_by_xpath(Clubs.Profile.SQUAD_FOREIGNERS)),
-            "nationalTeamPlayers": numeric_or_default(self.get_text_by_xpath(Clubs.Profile.SQUAD_NATIONAL_PLAYERS)),
-        }
-        self.response["league"] = {
-            "id": extract_from_url(self.get_text_by_xpath(Clubs.Profile.LEAGUE_ID)),
-            "name": self.get_text_by_xpath(Clubs.Profile.LEAGUE_NAME),
-            "countryId": safe_regex(self.get_text_by_xpath(Clubs.Profile.LEAGUE_COUNTRY_ID), REGEX_COUNTRY_ID, "id"),
-            "countryName": self.get_text_by_xpath(Clubs.Profile.LEAGUE_COUNTRY_NAME),
-            "tier": self.get_text_by_xpath(Clubs.Profile.LEAGUE_TIER),
-        }
-        self.response["historicalCrests"] = [
-            (safe_split(crest, "?") or [crest])[0]
-            for crest in self.get_list_by_xpath(Clubs.Profile.CRESTS_HISTORICAL)
-            if crest
-        ]
 
         return self.response
@@ -4,6 +4,11 @@ from app.services.base import TransfermarktBase
 from app.utils.utils import extract_from_url
 from app.utils.xpath import Competitions
 
+FALLBACK_BASE_URLS = (
+    "https://www.transfermarkt.com/-/teilnehmer/wettbewerb",
+    "https://www.transfermarkt.com/-/teilnehmer/pokalwettbewerb",
+)
+
 
 @dataclass
 class TransfermarktCompetitionClubs(TransfermarktBase):
@@ -26,65 +31,49 @@ class TransfermarktCompetitionClubs(TransfermarktBase):
         self.page = self.request_url_page()
         self.raise_exception_if_not_found(xpath=Competitions.Profile.NAME)
 
-    def __parse_competition_clubs(self) -> list:
+    def __parse_competition_clubs(self) -> dict:
         """
         Parse the competition's page and extract information about the football clubs participating
             in the competition.
 
         Returns:
-            list: A list of dictionaries, where each dictionary contains information about a
-                football club in the competition, including the club's unique identifier and name.
+            dict: A mapping of each club's unique identifier to its name, in page order.
         """
         urls = self.get_list_by_xpath(Competitions.Clubs.URLS)
         names = self.get_list_by_xpath(Competitions.Clubs.NAMES)
         ids = [extract_from_url(url) for url in urls]
 
-        return [{"id": idx, "name": name} for idx, name in zip(ids, names) if idx and name]
+        return {idx: name for idx, name in zip(ids, names) if idx and name}
 
     def __build_fallback_urls(self) -> list[str]:
-        base_urls = [
-            "https://www.transfermarkt.com/-/teilnehmer/wettbewerb/{competition_id}",
-            "https://www.transfermarkt.com/-/teilnehmer/pokalwettbewerb/{competition_id}",
-        ]
-
-        formatted_urls = []
-        for url in base_urls:
-            formatted = url.format(competition_id=self.competition_id)
-            if self.season_id:
-                separator = "&" if "?" in formatted else "?"
-                formatted = f"{formatted}{separator}saison_id={self.season_id}"
-            formatted_urls.append(formatted)
-
-        return formatted_urls
+        query = f"?saison_id={self.season_id}" if self.season_id else ""
+        return [f"{url}/{self.competition_id}{query}" for url in FALLBACK_BASE_URLS]
 
     def __parse_competition_clubs_with_fallback(self) -> list:
         clubs = self.__parse_competition_clubs()
-        if len(clubs) > 4:
-            return clubs
 
-        original_page = self.page
-        best_clubs = clubs
+        if len(clubs) <= 4:
+            original_page = self.page
+            for url in self.__build_fallback_urls():
+                try:
+                    fallback_page = self.request_url_page(url=url)
+                except Exception:
+                    continue
 
-        for url in self.__build_fallback_urls():
-            try:
-                fallback_page = self.request_url_page(url=url)
-            except Exception:
-                continue
+                try:
+                    self.page = fallback_page
+                    fallback_clubs = self.__parse_competition_clubs()
+                finally:
+                    self.page = original_page
 
-            fallback_clubs: list = []
-            try:
-                self.page = fallback_page
-                fallback_clubs = self.__parse_competition_clubs()
-            finally:
-                self.page = original_page
+                # Merge rather than replace so clubs found on earlier pages are never discarded.
+                for club_id, club_name in fallback_clubs.items():
+                    clubs.setdefault(club_id, club_name)
 
-            if len(fallback_clubs) > len(best_clubs):
-                best_clubs = fallback_clubs
-
-            if len(best_clubs) > 4:
-                break
+                if len(clubs) > 4:
+                    break
 
-        return best_clubs
+        return [{"id": club_id, "name": club_name} for club_id, club_name in clubs.items()]
 
     def get_competition_clubs(self) -> dict:
         """
@@ -1,54 +1,89 @@
 from __future__ import annotations
 
-from itertools import cycle
+import time
+from itertools import count
 from pathlib import Path
 from threading import Lock
 from typing import Optional
 
+DEAD_PROXY_COOLDOWN_SECONDS = 60.0
+FILE_CHECK_INTERVAL_SECONDS = 5.0
+
 
 class ProxyManager:
-    def __init__(self, file_path: Optional[Path] = None) -> None:
+    def __init__(
+        self,
+        file_path: Optional[Path] = None,
+        dead_cooldown: float = DEAD_PROXY_COOLDOWN_SECONDS,
+        check_interval: float = FILE_CHECK_INTERVAL_SECONDS,
+    ) -> None:
         root_dir = Path(__file__).resolve().parents[2]
         self._file_path = file_path or root_dir / "proxies.txt"
         self._lock = Lock()
         self._last_mtime: Optional[float] = None
-        self._proxies: list[str] = []
-        self._proxy_cycle = None
+        self._proxies: tuple[str, ...] = ()
+        self._counter = count()
+        self._dead_until: dict[str, float] = {}
+        self._dead_cooldown = dead_cooldown
+        self._check_interval = check_interval
+        self._next_check_ts = 0.0
 
     def _refresh(self) -> None:
-        if not self._file_path.exists():
-            self._proxies = []
-            self._proxy_cycle = None
-            self._last_mtime = None
+        # Stat the proxy file at most once per interval; edits are picked up within that window.
+        now = time.monotonic()
+        if now < self._next_check_ts:
             return
+        self._next_check_ts = now + self._check_interval
+
+        try:
+            current_mtime: Optional[float] = self._file_path.stat().st_mtime
+        except FileNotFoundError:
+            current_mtime = None
 
-        current_mtime = self._file_path.stat().st_mtime
-        if self._last_mtime == current_mtime and self._proxy_cycle:
+        if current_mtime == self._last_mtime:
             return
 
-        with self._file_path.open(encoding="utf-8") as file:
-            proxies = [line.strip() for line in file if line.strip() and not line.lstrip().startswith("#")]
+        with self._lock:
+            # Another thread may have reloaded the file while we waited for the lock.
+            if current_mtime == self._last_mtime:
+                return
+
+            proxies: tuple[str, ...] = ()
+            if current_mtime is not None:
+                with self._file_path.open(encoding="utf-8") as file:
+                    proxies = tuple(
+                        line.strip() for line in file if line.strip() and not line.lstrip().startswith("#")
+                    )
 
-        self._proxies = proxies
-        self._last_mtime = current_mtime
-        self._proxy_cycle = cycle(self._proxies) if self._proxies else None
+            self._proxies = proxies
+            self._dead_until = {}
+            self._last_mtime = current_mtime
 
     def get_all(self) -> list[str]:
-        with self._lock:
-            self._refresh()
-            return list(self._proxies)
+        self._refresh()
+        return list(self._proxies)
 
     def get_next(self) -> Optional[str]:
-        with self._lock:
-            self._refresh()
-            if not self._proxy_cycle:
-                return None
-            try:
-                return next(self._proxy_cycle)
-            except StopIteration:
-                # cycle should not raise StopIteration, but reset if it ever happens
-                self._proxy_cycle = cycle(self._proxies) if self._proxies else None
-                return next(self._proxy_cycle) if self._proxy_cycle else None
+        # Round-robin over an immutable tuple; next() on itertools.count is atomic under the GIL,
+        # so no lock is needed unless the proxy file changed.
+        self._refresh()
+        proxies = self._proxies
+        if not proxies:
+            return None
+
+        dead_until = self._dead_until
+        now = time.monotonic() if dead_until else 0.0
+        for _ in range(len(proxies)):
+            proxy = proxies[next(self._counter) % len(proxies)]
+            if not dead_until or dead_until.get(proxy, 0.0) <= now:
+                return proxy
+        # Every proxy is cooling down; keep rotating rather than failing outright.
+        return proxies[next(self._counter) % len(proxies)]
+
+    def mark_dead(self, proxy: Optional[str]) -> None:
+        """Skip a failing proxy in the rotation until its cooldown expires or the proxy file changes."""
+        if proxy:
+            self._dead_until[proxy] = time.monotonic() + self._dead_cooldown
 
 
 _proxy_manager = ProxyManager()
@@ -64,3 +99,7 @@ def get_proxy_list() -> list[str]:
 
 def get_next_proxy() -> Optional[str]:
     return _proxy_manager.get_next()
+
+
+def mark_proxy_dead(proxy: Optional[str]) -> None:
+    _proxy_manager.mark_dead(proxy)
@@ -2,6 +2,8 @@ import re
 from typing import Optional, Union
 from urllib.parse import parse_qs, urlparse
 
+from app.utils.regex import REGEX_TFMKT_URL
+
 
 def zip_lists_into_dict(list_keys: list, list_values: list) -> dict:
     """
@@ -31,19 +33,10 @@ def extract_from_url(tfmkt_url: Optional[str], element: str = "id") -> Optional[
     if not tfmkt_url:
         return None
 
-    regex: str = (
-        r"/(?P<code>[\w%-]+)"
-        r"/(?P<category>[\w-]+)"
-        r"/(?P<type>[\w-]+)"
-        r"/(?P<id>\w+)"
-        r"(/saison_id/(?P<season_id>\d{4}))?"
-        r"(/transfer_id/(?P<transfer_id>\d+))?"
-    )
-
     trimmed_url = trim(tfmkt_url)
 
     try:
-        match = re.match(regex, trimmed_url)
+        match = REGEX_TFMKT_URL.match(trimmed_url)
         groups: dict = match.groupdict() if match else {}
     except TypeError:
         groups = {}
@@ -100,13 +93,13 @@ def trim(text: Union[list, str]) -> str:
     return text.strip().replace("\xa0", "")
 
 
-def safe_regex(text: Optional[Union[str, list]], regex, group: str) -> Optional[str]:
+def safe_regex(text: Optional[Union[str, list]], regex: Union[re.Pattern, str], group: str) -> Optional[str]:
     """
     Safely apply a regular expression and extract a specific group from the matched text.
 
     Args:
         text (Optional[str]): The text to apply the regular expression to.
-        regex: The regular expression pattern.
+        regex (Union[re.Pattern, str]): The regular expression, preferably precompiled at module level.
         group (str): The name of the group to extract.
 
     Returns:
@@ -115,11 +108,11 @@ def safe_regex(text: Optional[Union[str, list]], regex, group: str) -> Optional[
     if not isinstance(text, (str, list)) or not text:
         return None
 
-    try:
-        groups = re.search(regex, trim(text)).groupdict()
-        return groups.get(group)
-    except AttributeError:
+    pattern = regex if isinstance(regex, re.Pattern) else re.compile(regex)
+    match = pattern.search(trim(text))
+    if match is None or group not in pattern.groupindex:
         return None
+    return match.group(group)
 
 
 def remove_str(text: Optional[str], strings_to_remove: Union[str, list]) -> Optional[str]:
@@ -1,10 +1,20 @@
 from datetime import datetime
+from unittest.mock import patch
 
 import pytest
 from fastapi import HTTPException
+from lxml import etree
 from schema import And, Schema
 
-from app.services.competitions.clubs import TransfermarktCompetitionClubs
+from app.services.competitions.clubs import FALLBACK_BASE_URLS, TransfermarktCompetitionClubs
+
+
+def clubs_page(*clubs):
+    rows = "".join(
+        f'<tr><td class="hauptlink no-border-links"><a href="/club/startseite/verein/{club_id}">{name}</a></td></tr>'
+        for club_id, name in clubs
+    )
+    return etree.HTML(f"<html><body><table>{rows}</table></body></html>")
 
 
 def test_get_competition_clubs_not_found():
@@ -33,3 +43,55 @@ def test_get_competition_clubs(competition_id, season_id, len_greater_than_0, re
     )
 
     assert expected_schema.validate(result)
+
+
+def parse_clubs_with_fallback(pages):
+    def request_url_page(url=None):
+        page = pages[url]
+        if isinstance(page, Exception):
+            raise page
+        return page
+
+    with patch.object(TransfermarktCompetitionClubs, "request_url_page", side_effect=request_url_page):
+        with patch.object(TransfermarktCompetitionClubs, "raise_exception_if_not_found"):
+            tfmkt = TransfermarktCompetitionClubs(competition_id="XX1", season_id="2023")
+            return tfmkt.get_competition_clubs()["clubs"]
+
+
+def test_get_competition_clubs_merges_fallback_pages():
+    league_url, cup_url = (f"{url}/XX1?saison_id=2023" for url in FALLBACK_BASE_URLS)
+    pages = {
+        None: clubs_page(("1", "A"), ("2", "B")),
+        league_url: clubs_page(("2", "B renamed"), ("3", "C")),
+        cup_url: clubs_page(("4", "D"), ("5", "E"), ("1", "A renamed")),
+    }
+
+    assert parse_clubs_with_fallback(pages) == [
+        {"id": "1", "name": "A"},
+        {"id": "2", "name": "B"},
+        {"id": "3", "name": "C"},
+        {"id": "4", "name": "D"},
+        {"id": "5", "name": "E"},
+    ]
+
+
+def test_get_competition_clubs_stops_after_enough_fallback_clubs():
+    league_url, cup_url = (f"{url}/XX1?saison_id=2023" for url in FALLBACK_BASE_URLS)
+    pages = {
+        None: clubs_page(("1", "A")),
+        league_url: clubs_page(*((str(i), f"Club {i}") for i in range(2, 7))),
+        cup_url: AssertionError("fallback pages are not needed once more than four clubs are found"),
+    }
+
+    assert [club["id"] for club in parse_clubs_with_fallback(pages)] == ["1", "2", "3", "4", "5", "6"]
+
+
+def test_get_competition_clubs_skips_failed_fallback_pages():
+    league_url, cup_url = (f"{url}/XX1?saison_id=2023" for url in FALLBACK_BASE_URLS)
+    pages = {
+        None: clubs_page(("1", "A")),
+        league_url: HTTPException(status_code=404),
+        cup_url: clubs_page(("2", "B")),
+    }
+
+    assert parse_clubs_with_fallback(pages) == [{"id": "1", "name": "A"}, {"id": "2", "name": "B"}]
@@ -0,0 +1,109 @@
+import os
+
+from app.utils.proxies import ProxyManager
+
+
+def write_proxies(path, *proxies, mtime=None):
+    path.write_text("\n".join(proxies) + "\n", encoding="utf-8")
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_get_next_rotates_round_robin(tmp_path):
+    proxy_file = tmp_path / "proxies.txt"
+    write_proxies(proxy_file, "# comment", "http://a:1", "", "  http://b:2  ", "http://c:3")
+    manager = ProxyManager(file_path=proxy_file)
+
+    assert manager.get_all() == ["http://a:1", "http://b:2", "http://c:3"]
+    assert [manager.get_next() for _ in range(6)] == [
+        "http://a:1",
+        "http://b:2",
+        "http://c:3",
+        "http://a:1",
+        "http://b:2",
+        "http://c:3",
+    ]
+
+
+def test_get_next_skips_dead_proxies(tmp_path):
+    proxy_file = tmp_path / "proxies.txt"
+    write_proxies(proxy_file, "http://a:1", "http://b:2", "http://c:3")
+    manager = ProxyManager(file_path=proxy_file)
+    manager.get_all()
+    manager.mark_dead("http://b:2")
+
+    assert [manager.get_next() for _ in range(4)] == ["http://a:1", "http://c:3", "http://a:1", "http://c:3"]
+
+
+def test_get_next_revives_dead_proxies_after_cooldown(tmp_path):
+    proxy_file = tmp_path / "proxies.txt"
+    write_proxies(proxy_file, "http://a:1", "http://b:2")
+    manager = ProxyManager(file_path=proxy_file, dead_cooldown=0.0)
+    manager.get_all()
+    manager.mark_dead("http://a:1")
+
+    assert [manager.get_next() for _ in range(2)] == ["http://a:1", "http://b:2"]
+
+
+def test_get_next_falls_back_when_all_proxies_are_dead(tmp_path):
+    proxy_file = tmp_path / "proxies.txt"
+    write_proxies(proxy_file, "http://a:1", "http://b:2")
+    manager = ProxyManager(file_path=proxy_file)
+    manager.get_all()
+    manager.mark_dead("http://a:1")
+    manager.mark_dead("http://b:2")
+
+    assert {manager.get_next() for _ in range(4)} == {"http://a:1", "http://b:2"}
+
+
+def test_mark_dead_ignores_missing_proxy(tmp_path):
+    proxy_file = tmp_path / "proxies.txt"
+    write_proxies(proxy_file, "http://a:1")
+    manager = ProxyManager(file_path=proxy_file)
+    manager.mark_dead(None)
+
+    assert manager.get_next() == "http://a:1"
+
+
+def test_reload_picks_up_changes_and_clears_dead_proxies(tmp_path):
+    proxy_file = tmp_path / "proxies.txt"
+    write_proxies(proxy_file, "http://a:1", "http://b:2", mtime=1_000_000)
+    manager = ProxyManager(file_path=proxy_file, check_interval=0.0)
+    manager.get_all()
+    manager.mark_dead("http://a:1")
+    assert manager.get_next() == "http://b:2"
+
+    write_proxies(proxy_file, "http://a:1", "http://c:3", mtime=2_000_000)
+
+    assert manager.get_all() == ["http://a:1", "http://c:3"]
+    assert {manager.get_next() for _ in range(2)} == {"http://a:1", "http://c:3"}
+
+
+def test_reload_is_throttled_by_check_interval(tmp_path):
+    proxy_file = tmp_path / "proxies.txt"
+    write_proxies(proxy_file, "http://a:1", mtime=1_000_000)
+    manager = ProxyManager(file_path=proxy_file, check_interval=3600.0)
+    assert manager.get_all() == ["http://a:1"]
+
+    write_proxies(proxy_file, "http://b:2", mtime=2_000_000)
+
+    assert manager.get_all() == ["http://a:1"]
+
+
+def test_missing_file_disables_proxies(tmp_path):
+    manager = ProxyManager(file_path=tmp_path / "missing.txt")
+
+    assert manager.get_all() == []
+    assert manager.get_next() is None
+
+
+def test_deleted_file_clears_proxies(tmp_path):
+    proxy_file = tmp_path / "proxies.txt"
+    write_proxies(proxy_file, "http://a:1")
+    manager = ProxyManager(file_path=proxy_file, check_interval=0.0)
+    assert manager.get_next() == "http://a:1"
+
+    proxy_file.unlink()
+
+    assert manager.get_all() == []
+    assert manager.get_next() is None
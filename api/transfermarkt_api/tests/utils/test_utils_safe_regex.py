@@ -0,0 +1,34 @@
+import pytest
+
+from app.utils.regex import REGEX_CHART_CLUB_ID, REGEX_DOB
+from app.utils.utils import safe_regex
+
+
+@pytest.mark.parametrize(
+    "text,group,expected",
+    [
+        ("Jan 1, 2000 (24)", "dob", "Jan 1, 2000"),
+        ("Jan 1, 2000 (24)", "age", "24"),
+        ("  Jan 1, 2000 (24)\xa0 ", "dob", "Jan 1, 2000"),
+        (["Jan 1, ", "2000 (24)"], "age", "24"),
+    ],
+)
+def test_safe_regex_precompiled_pattern(text, group, expected):
+    assert safe_regex(text, REGEX_DOB, group) == expected
+
+
+def test_safe_regex_string_pattern():
+    assert safe_regex("/wappen/tiny/27.png", r"(?P<club_id>\d+)", "club_id") == "27"
+
+
+def test_safe_regex_missing_group():
+    assert safe_regex("/wappen/tiny/27.png", REGEX_CHART_CLUB_ID, "season_id") is None
+
+
+def test_safe_regex_no_match():
+    assert safe_regex("no digits here", REGEX_CHART_CLUB_ID, "club_id") is None
+
+
+@pytest.mark.parametrize("text", [None, "", [], 27])
+def test_safe_regex_invalid_text(text):
+    assert safe_regex(text, REGEX_CHART_CLUB_ID, "club_id") is None
@@ -1,25 +1,29 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
+import os
+import queue
 import threading
+import time
+from collections import OrderedDict, deque
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Annotated, Deque, Dict, List, Optional, Union
 from uuid import uuid4
 
+import orjson
 import requests
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
-from pydantic import BaseModel, Field, validator
+from fastapi.responses import FileResponse, ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field, field_validator
 
 from . import pipeline
 
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Transfermarkt Workflow API")
+app = FastAPI(title="Transfermarkt Workflow API", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -30,24 +34,127 @@ app.add_middleware(
 )
 
 
+# Only the most recent log records are kept for job snapshots; the SSE stream still delivers every record.
+try:
+    JOB_LOG_LIMIT = max(1, int(os.environ.get("WORKFLOW_JOB_LOG_LIMIT", "5000")))
+except ValueError:
+    JOB_LOG_LIMIT = 5000
+# Events waiting for a slow or detached SSE client are capped, counting every batched log record;
+# the oldest are dropped first and the stream reports how many were lost.
+JOB_QUEUE_SIZE = 1024
+# Finished jobs are forgotten after the TTL, and the oldest finished jobs are evicted beyond the history limit.
+try:
+    JOB_TTL_SECONDS = max(0.0, float(os.environ.get("WORKFLOW_JOB_TTL_SECONDS", "3600")))
+except ValueError:
+    JOB_TTL_SECONDS = 3600.0
+try:
+    JOB_HISTORY_LIMIT = max(1, int(os.environ.get("WORKFLOW_JOB_HISTORY_LIMIT", "256")))
+except ValueError:
+    JOB_HISTORY_LIMIT = 256
+# A per-job delivery thread hands log records to the event loop in batches of up to this many,
+# flushing early once no new record has arrived within the flush delay.
+LOG_BATCH_SIZE = 64
+LOG_FLUSH_DELAY_SECONDS = 0.05
+
+
+DATA_DIR_PREFIX = str(pipeline.DATA_DIR) + os.sep
+# Downloads are sandboxed against the symlink-free data directory, resolved once at import.
+DATA_DIR_REAL = os.path.realpath(pipeline.DATA_DIR)
+DATA_DIR_REAL_PREFIX = DATA_DIR_REAL + os.sep
+
+
 def serialise_path(path: Path) -> str:
-    try:
-        return str(path.relative_to(pipeline.DATA_DIR))
-    except ValueError:
-        return str(path)
+    # Workflow outputs are built from pipeline.DATA_DIR, so a string prefix check replaces Path.relative_to.
+    text = str(path)
+    return text[len(DATA_DIR_PREFIX):] if text.startswith(DATA_DIR_PREFIX) else text
 
 
 class Job:
+    __slots__ = (
+        "id",
+        "loop",
+        "queue",
+        "queued_events",
+        "events_dropped",
+        "events",
+        "delivery_thread",
+        "logs",
+        "logs_truncated",
+        "status",
+        "error",
+        "result",
+        "payload",
+        "created_at",
+        "finished_at",
+        "lock",
+    )
+
     def __init__(self, job_id: str, loop: asyncio.AbstractEventLoop) -> None:
         self.id = job_id
         self.loop = loop
+        # Unbounded by item count: _enqueue caps the queued events itself, since a log batch holds many.
         self.queue: asyncio.Queue[Optional[dict]] = asyncio.Queue()
-        self.logs: List[dict] = []
+        self.queued_events = 0
+        self.events_dropped = 0
+        # Encoded log records (bytes), other events (dict) and the end-of-stream marker (None), in emission order.
+        self.events: "queue.SimpleQueue[Union[bytes, dict, None]]" = queue.SimpleQueue()
+        self.logs: Deque[orjson.Fragment] = deque(maxlen=JOB_LOG_LIMIT)
+        self.logs_truncated = False
         self.status: str = "pending"
         self.error: Optional[str] = None
         self.result: Optional[pipeline.WorkflowResult] = None
+        self.payload: Optional[dict] = None
         self.created_at = datetime.utcnow().isoformat()
+        self.finished_at: Optional[float] = None
         self.lock = threading.Lock()
+        self.delivery_thread = threading.Thread(target=self._deliver_events, name=f"job-{job_id}-events", daemon=True)
+        self.delivery_thread.start()
+
+    @staticmethod
+    def _event_count(item: Optional[dict]) -> int:
+        return len(item["records"]) if item is not None and item["type"] == "log_batch" else 1
+
+    def _enqueue(self, item: Optional[dict]) -> None:
+        # Runs on the event loop thread, so the event count and the evictions cannot race the consumer.
+        size = self._event_count(item)
+        while self.queued_events + size > JOB_QUEUE_SIZE and not self.queue.empty():
+            dropped = self._event_count(self.queue.get_nowait())
+            self.queued_events -= dropped
+            self.events_dropped += dropped
+        self.queue.put_nowait(item)
+        self.queued_events += size
+
+    async def next_event(self) -> Optional[dict]:
+        item = await self.queue.get()
+        self.queued_events -= self._event_count(item)
+        return item
+
+    def _hand_off(self, item: Optional[dict]) -> None:
+        self.loop.call_soon_threadsafe(self._enqueue, item)
+
+    def _deliver_events(self) -> None:
+        # Runs on the delivery thread: pipeline threads only push onto a SimpleQueue, and this loop
+        # batches consecutive log records into one cross-thread hop each.
+        records: List[bytes] = []
+        while True:
+            try:
+                item = self.events.get(timeout=LOG_FLUSH_DELAY_SECONDS) if records else self.events.get()
+            except queue.Empty:
+                self._hand_off({"type": "log_batch", "records": records})
+                records = []
+                continue
+            if isinstance(item, bytes):
+                records.append(item)
+                if len(records) >= LOG_BATCH_SIZE:
+                    self._hand_off({"type": "log_batch", "records": records})
+                    records = []
+                continue
+            if records:
+                self._hand_off({"type": "log_batch", "records": records})
+                records = []
+            self._hand_off(item)
+            if item is None:
+                return
 
     def log(self, message: str) -> None:
         record = {
@@ -55,132 +162,158 @@ class Job:
             "message": message,
             "timestamp": datetime.utcnow().isoformat(),
         }
-        with self.lock:
-            self.logs.append(record)
-        self.loop.call_soon_threadsafe(self.queue.put_nowait, record)
+        # Serialise once: job snapshots embed the bytes verbatim and the SSE stream frames them as-is.
+        encoded = orjson.dumps(record)
+        if len(self.logs) == self.logs.maxlen:
+            # Appending to a full deque drops the oldest line.
+            self.logs_truncated = True
+        self.logs.append(orjson.Fragment(encoded))
+        self.events.put_nowait(encoded)
 
     def set_status(self, status: str) -> None:
-        with self.lock:
-            self.status = status
-        event = {"type": "status", "status": status, "timestamp": datetime.utcnow().isoformat()}
-        self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+        self.status = status
+        self.events.put_nowait({"type": "status", "status": status, "timestamp": datetime.utcnow().isoformat()})
 
     def finish(self, result: pipeline.WorkflowResult) -> None:
+        # The result never changes once the job completes, so the serialised payload is built only here.
+        payload = self._build_result_payload(result)
         with self.lock:
             self.result = result
+            self.payload = payload
             self.error = None
+            self.finished_at = time.monotonic()
         self.set_status("completed")
-        self.loop.call_soon_threadsafe(
-            self.queue.put_nowait,
+        self.events.put_nowait(
             {
                 "type": "result",
                 "status": "completed",
                 "timestamp": datetime.utcnow().isoformat(),
-                "data": self.result_payload(),
-            },
+                "data": payload,
+            }
         )
-        self.loop.call_soon_threadsafe(self.queue.put_nowait, None)
+        self.events.put_nowait(None)
 
     def fail(self, error: str) -> None:
         with self.lock:
             self.error = error
+            self.finished_at = time.monotonic()
         self.set_status("failed")
-        self.loop.call_soon_threadsafe(
-            self.queue.put_nowait,
+        self.events.put_nowait(
             {
                 "type": "error",
                 "status": "failed",
                 "timestamp": datetime.utcnow().isoformat(),
                 "error": error,
-            },
+            }
         )
-        self.loop.call_soon_threadsafe(self.queue.put_nowait, None)
+        self.events.put_nowait(None)
 
-    def result_payload(self) -> Optional[dict]:
-        if not self.result:
-            return None
+    @staticmethod
+    def _build_result_payload(result: pipeline.WorkflowResult) -> dict:
         return {
-            "teams": self.result.team_details,
-            "club_ids_csv": serialise_path(self.result.club_ids_csv),
-            "generated_csvs": [serialise_path(path) for path in self.result.generated_csvs],
-            "augmented_csvs": [serialise_path(path) for path in self.result.augmented_csvs],
-            "workbook": serialise_path(self.result.workbook_path),
-            "selected_fields": self.result.selected_fields,
+            "teams": result.team_details,
+            "club_ids_csv": serialise_path(result.club_ids_csv),
+            "generated_csvs": [serialise_path(path) for path in result.generated_csvs],
+            "augmented_csvs": [serialise_path(path) for path in result.augmented_csvs],
+            "workbook": serialise_path(result.workbook_path),
+            "selected_fields": result.selected_fields,
         }
 
+    def result_payload(self) -> Optional[dict]:
+        return self.payload
+
     def to_dict(self) -> dict:
         return {
             "id": self.id,
             "status": self.status,
             "error": self.error,
-            "logs": self.logs,
+            "logs": list(self.logs),
+            "logs_truncated": self.logs_truncated,
             "result": self.result_payload(),
             "created_at": self.created_at,
         }
 
 
-jobs: Dict[str, Job] = {}
+# Only touched from the event loop thread; insertion order doubles as job age.
+jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+
+def prune_jobs() -> None:
+    # Running jobs are never evicted. Finished jobs have already queued their end-of-stream marker,
+    # so any SSE client still attached to one drains it and disconnects normally.
+    now = time.monotonic()
+    excess = len(jobs) - JOB_HISTORY_LIMIT
+    for job_id, job in list(jobs.items()):
+        if job.finished_at is None:
+            continue
+        if excess > 0 or now - job.finished_at >= JOB_TTL_SECONDS:
+            del jobs[job_id]
+            excess -= 1
+
+
+def _blank_to_none(value):
+    return None if value == "" else value
+
+
+OptionalInt = Annotated[Optional[int], BeforeValidator(_blank_to_none)]
+OptionalFloat = Annotated[Optional[float], BeforeValidator(_blank_to_none)]
 
 
 class RunRequest(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True)
+
     team_ids: List[str] = Field(default_factory=list, description="List of Transfermarkt club IDs")
     season_id: Optional[str] = Field(default=None, description="Optional season filter")
     fields: List[str] = Field(default_factory=list, description="Custom workbook field order")
     enable_parallel: bool = Field(default=True, description="Enable concurrent API requests")
-    max_parallel_requests: Optional[int] = Field(default=None, ge=1, description="Maximum concurrent requests")
+    max_parallel_requests: OptionalInt = Field(default=None, ge=1, description="Maximum concurrent requests")
     enable_rate_limit: bool = Field(default=False, description="Apply delay between player profile requests")
-    rate_limit_delay: Optional[float] = Field(default=None, ge=0.0, description="Delay between player profile requests in seconds")
+    rate_limit_delay: OptionalFloat = Field(default=None, ge=0.0, description="Delay between player profile requests in seconds")
     enable_retry: bool = Field(default=True, description="Retry failed player profile requests")
-    max_retries: Optional[int] = Field(default=None, ge=1, description="Maximum retry attempts per player")
+    max_retries: OptionalInt = Field(default=None, ge=1, description="Maximum retry attempts per player")
 
-    @validator("team_ids", pre=True)
-    def _coerce_ids(cls, value):  # type: ignore[override]
-        if isinstance(value, str):
-            value = [value]
-        if isinstance(value, list):
-            cleaned = []
-            for item in value:
-                if item is None:
-                    continue
-                item = str(item).strip()
-                if item:
-                    cleaned.append(item)
-            return cleaned
-        raise ValueError("team_ids must be an array or string")
-
-    @validator("fields", pre=True)
-    def _coerce_fields(cls, value):  # type: ignore[override]
+    @field_validator("team_ids", "fields", mode="before")
+    @classmethod
+    def _coerce_list(cls, value):
         if value is None:
             return []
         if isinstance(value, str):
             value = [value]
         if isinstance(value, list):
-            return [str(item).strip() for item in value if str(item).strip()]
-        raise ValueError("fields must be an array or string")
-
-    @validator("max_parallel_requests", "max_retries", pre=True)
-    def _coerce_optional_int(cls, value):  # type: ignore[override]
-        if value is None or value == "":
-            return None
-        try:
-            return int(value)
-        except (TypeError, ValueError) as exc:  # pragma: no cover - defensive
-            raise ValueError("Value must be an integer") from exc
-
-    @validator("rate_limit_delay", pre=True)
-    def _coerce_optional_float(cls, value):  # type: ignore[override]
-        if value is None or value == "":
-            return None
-        try:
-            return float(value)
-        except (TypeError, ValueError) as exc:  # pragma: no cover - defensive
-            raise ValueError("Value must be a float") from exc
+            # Club IDs may arrive as JSON numbers; blank entries are dropped rather than rejected.
+            return [text for text in (str(item).strip() for item in value if item is not None) if text]
+        raise ValueError("must be an array or string")
 
 
 class RunResponse(BaseModel):
     job_id: str
 
 
+class JobLogEntry(BaseModel):
+    type: str
+    message: str
+    timestamp: str
+
+
+class JobResultPayload(BaseModel):
+    teams: List[Dict[str, str]]
+    club_ids_csv: str
+    generated_csvs: List[str]
+    augmented_csvs: List[str]
+    workbook: str
+    selected_fields: List[str]
+
+
+class JobState(BaseModel):
+    id: str
+    status: str
+    error: Optional[str] = None
+    logs: List[JobLogEntry]
+    logs_truncated: bool = False
+    result: Optional[JobResultPayload] = None
+    created_at: str
+
+
 async def launch_job(
     team_ids: List[str],
     season_id: Optional[str],
@@ -197,6 +330,7 @@ async def launch_job(
     job_id = uuid4().hex
     job = Job(job_id, loop)
     jobs[job_id] = job
+    prune_jobs()
 
     job.log(f"Received {len(team_ids)} club IDs")
     if fields:
@@ -237,6 +371,7 @@ async def launch_job(
                 max_parallel_requests=parallel_limit,
                 player_request_delay=request_delay,
                 player_max_retries=retry_limit,
+                fields_already_validated=True,
             )
         except pipeline.WorkflowError as exc:
             job.fail(str(exc))
@@ -250,22 +385,37 @@ async def launch_job(
     return job
 
 
-def sse_format(payload: dict) -> str:
-    return f"data: {json.dumps(payload)}\n\n"
+SSE_STATUS_PREFIX = b'data: {"type":"status","status":"'
 
 
-@app.get("/api/fields")
-async def list_fields() -> dict:
-    return {
+def sse_format(payload: dict) -> bytes:
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+
+def sse_status(status: str) -> bytes:
+    # Job statuses are fixed ASCII identifiers, so the event can be assembled without a JSON encoder.
+    return SSE_STATUS_PREFIX + status.encode() + b'"}\n\n'
+
+
+# The field catalogue and health payload never change at runtime, so they are serialised once at import.
+FIELDS_BYTES = orjson.dumps(
+    {
         "fields": [{"id": key, "label": label} for key, label in pipeline.AVAILABLE_FIELDS.items()],
         "default": list(pipeline.DEFAULT_FIELD_ORDER),
     }
+)
+HEALTH_BYTES = orjson.dumps({"status": "ok"})
+
+
+@app.get("/api/fields")
+async def list_fields() -> Response:
+    return Response(FIELDS_BYTES, media_type="application/json")
 
 
 @app.get("/api/status/proxies")
-async def proxy_status() -> dict:
+async def proxy_status() -> ORJSONResponse:
     try:
-        return pipeline.get_proxy_status()
+        return ORJSONResponse(pipeline.get_proxy_status())
     except requests.RequestException as exc:
         logger.warning("Unable to reach Transfermarkt API proxy status", exc_info=exc)
         raise HTTPException(status_code=503, detail="Upstream proxy status unavailable") from exc
@@ -275,10 +425,10 @@ async def proxy_status() -> dict:
 
 
 @app.post("/api/run", response_model=RunResponse)
-async def api_run(payload: RunRequest) -> RunResponse:
+async def api_run(payload: RunRequest) -> ORJSONResponse:
     if not payload.team_ids:
         raise HTTPException(status_code=400, detail="Provide at least one club ID")
-    fields = [field for field in payload.fields if field in pipeline.AVAILABLE_FIELDS]
+    fields = [field for field in payload.fields if field in pipeline.AVAILABLE_FIELD_IDS]
     job = await launch_job(
         payload.team_ids,
         payload.season_id,
@@ -290,15 +440,26 @@ async def api_run(payload: RunRequest) -> RunResponse:
         enable_retry=payload.enable_retry,
         max_retries=payload.max_retries,
     )
-    return RunResponse(job_id=job.id)
+    return ORJSONResponse({"job_id": job.id})
 
 
-@app.get("/api/jobs/{job_id}")
-async def get_job(job_id: str) -> JSONResponse:
+@app.get("/api/jobs/{job_id}", response_model=JobState)
+async def get_job(job_id: str) -> ORJSONResponse:
     job = jobs.get(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
-    return JSONResponse(job.to_dict())
+    return ORJSONResponse(job.to_dict())
+
+
+@app.delete("/api/jobs/{job_id}", status_code=204)
+async def delete_job(job_id: str) -> Response:
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.finished_at is None:
+        raise HTTPException(status_code=409, detail="Job is still running")
+    del jobs[job_id]
+    return Response(status_code=204)
 
 
 @app.get("/api/jobs/{job_id}/stream")
@@ -308,12 +469,26 @@ async def stream_job(job_id: str) -> StreamingResponse:
         raise HTTPException(status_code=404, detail="Job not found")
 
     async def event_generator():
-        yield sse_format({"type": "status", "status": job.status})
+        yield sse_status(job.status)
         while True:
-            item = await job.queue.get()
+            item = await job.next_event()
+            if job.events_dropped:
+                # Everything dropped was older than this item, so the marker goes out first.
+                yield sse_format(
+                    {
+                        "type": "events_dropped",
+                        "count": job.events_dropped,
+                        "timestamp": datetime.utcnow().isoformat(),
+                    }
+                )
+                job.events_dropped = 0
             if item is None:
                 break
-            yield sse_format(item)
+            if item["type"] == "log_batch":
+                # Unfold batched records into individual SSE frames, written in a single chunk.
+                yield b"".join(b"data: " + record + b"\n\n" for record in item["records"])
+            else:
+                yield sse_format(item)
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
@@ -322,16 +497,14 @@ async def stream_job(job_id: str) -> StreamingResponse:
 async def download(path: str) -> FileResponse:
     if not path:
         raise HTTPException(status_code=400, detail="Missing path parameter")
-    target = (pipeline.DATA_DIR / path).resolve()
-    try:
-        target.relative_to(pipeline.DATA_DIR)
-    except ValueError:
+    target = os.path.realpath(os.path.join(DATA_DIR_REAL, path))
+    if not target.startswith(DATA_DIR_REAL_PREFIX):
         raise HTTPException(status_code=400, detail="Invalid path")
-    if not target.is_file():
+    if not os.path.isfile(target):
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(target, filename=target.name)
+    return FileResponse(target, filename=os.path.basename(target))
 
 
 @app.get("/health")
-async def healthcheck() -> dict[str, str]:
-    return {"status": "ok"}
+async def healthcheck() -> Response:
+    return Response(HEALTH_BYTES, media_type="application/json")
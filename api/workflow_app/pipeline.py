@@ -2,12 +2,16 @@ from __future__ import annotations
 
 import csv
 import os
+import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 import sys
 from pathlib import Path
@@ -34,6 +38,8 @@ CLUB_IDS_CSV = DATA_DIR / "data" / "club_ids.csv"
 CLUBS_DIR = DATA_DIR / "data" / "clubs"
 TEAM_WORKBOOK = DATA_DIR / "data" / "exports" / "team_list.xlsx"
 AVAILABLE_FIELDS = get_available_fields()
+AVAILABLE_FIELD_IDS = frozenset(AVAILABLE_FIELDS)
+CLUB_COLUMNS = frozenset({"club_id", "club_name"})
 
 DEFAULT_API_BASE_URL = os.environ.get("TRANSFERMARKT_API_BASE_URL", "http://localhost:8000")
 try:
@@ -42,6 +48,18 @@ except ValueError:
     DEFAULT_MAX_PARALLEL_REQUESTS = 4
 
 
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=Retry(total=0))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# Shared by all workflow threads so API calls reuse keep-alive connections instead of reconnecting per request.
+HTTP_SESSION = _build_session()
+
+
 @dataclass
 class WorkflowResult:
     team_details: List[Dict[str, str]]
@@ -75,21 +93,24 @@ def _run_parallel_tasks(
         return []
 
     worker_count = _determine_worker_count(len(items), max_workers)
-    results: List[Tuple[int, object]] = []
+    # Results are slotted by submission position, so input order is kept without a final sort.
+    results: List[Optional[Tuple[int, object]]] = [None] * len(items)
 
     with ThreadPoolExecutor(max_workers=worker_count) as executor:
-        future_to_item = {executor.submit(handler, item): item for item in items}
+        future_to_position = {executor.submit(handler, item): position for position, item in enumerate(items)}
 
-        for future in as_completed(future_to_item):
-            item = future_to_item[future]
+        for future in as_completed(future_to_position):
+            position = future_to_position[future]
             try:
-                results.append(future.result())
+                results[position] = future.result()
             except Exception as exc:
+                item = items[position]
                 item_repr = item[1] if isinstance(item, tuple) and len(item) > 1 else item
                 emit(f"  Error while {label} for {item_repr}: {exc}")
+                # The workflow is aborted, so don't start the fetches still waiting in the queue.
+                executor.shutdown(wait=False, cancel_futures=True)
                 raise WorkflowError(f"Failed while {label} for {item_repr}: {exc}") from exc
 
-    results.sort(key=lambda entry: entry[0])
     return results
 
 
@@ -100,7 +121,7 @@ def get_api_base_url() -> str:
 
 def get_proxy_status(*, base_url: Optional[str] = None) -> Dict[str, object]:
     url = f"{(base_url or get_api_base_url()).rstrip('/')}/status/proxies"
-    response = requests.get(url, timeout=10)
+    response = HTTP_SESSION.get(url, timeout=10)
     response.raise_for_status()
     payload = response.json()
     enabled = bool(payload.get("enabled"))
@@ -110,9 +131,9 @@ def get_proxy_status(*, base_url: Optional[str] = None) -> Dict[str, object]:
 
 def fetch_club_profile(club_id: str, base_url: str) -> Dict[str, str]:
     url = f"{base_url}/clubs/{club_id}/profile"
-    response = requests.get(url, timeout=30)
+    response = HTTP_SESSION.get(url, timeout=30)
     response.raise_for_status()
-    return response.json()
+    return orjson.loads(response.content)
 
 
 def extract_club_name(profile: Dict[str, str], club_id: str) -> str:
@@ -126,9 +147,9 @@ def extract_club_name(profile: Dict[str, str], club_id: str) -> str:
 def fetch_club_players(club_id: str, base_url: str, season_id: Optional[str]) -> Dict:
     url = f"{base_url}/clubs/{club_id}/players"
     params = {"season_id": season_id} if season_id else None
-    response = requests.get(url, params=params, timeout=60)
+    response = HTTP_SESSION.get(url, params=params, timeout=60)
     response.raise_for_status()
-    return response.json()
+    return orjson.loads(response.content)
 
 
 def write_club_ids_csv(team_details: Iterable[Dict[str, str]], destination: Path = CLUB_IDS_CSV) -> Path:
@@ -151,39 +172,43 @@ def generate_player_csv(club_id: str, club_name: str, payload: Dict) -> Path:
         insert_index = 1 if fieldnames[0] == "club_id" else 0
         fieldnames = fieldnames[:insert_index] + ["club_name"] + fieldnames[insert_index:]
     target = CLUBS_DIR / f"{club_id}.csv"
+
+    # Resolve column positions once per file instead of re-checking every field name for every player.
+    template = [""] * len(fieldnames)
+    template[fieldnames.index("club_id")] = club_id
+    template[fieldnames.index("club_name")] = club_name
+    variable_columns = [(index, key) for index, key in enumerate(fieldnames) if key not in CLUB_COLUMNS]
+    serialise_value = fetch_players.serialise_value
+
+    def build_row(player: object) -> List[str]:
+        row = template.copy()
+        if isinstance(player, dict):
+            for index, key in variable_columns:
+                row[index] = serialise_value(player.get(key))
+        elif variable_columns:
+            row[variable_columns[0][0]] = serialise_value(player)
+        return row
+
     with target.open("w", newline="", encoding="utf-8") as fh:
-        writer = csv.DictWriter(fh, fieldnames=fieldnames)
-        writer.writeheader()
-        for player in players:
-            if isinstance(player, dict):
-                row = {
-                    key: fetch_players.serialise_value(player.get(key))
-                    for key in fieldnames
-                    if key not in {"club_id", "club_name"}
-                }
-            else:
-                value_key = next(
-                    (name for name in fieldnames if name not in {"club_id", "club_name"}),
-                    fieldnames[-1],
-                )
-                row = {value_key: fetch_players.serialise_value(player)}
-            row["club_id"] = club_id
-            row["club_name"] = club_name
-            writer.writerow(row)
+        writer = csv.writer(fh)
+        writer.writerow(fieldnames)
+        writer.writerows(build_row(player) for player in players)
     return target
 
 
-def build_team_workbook(
-    output: Path = TEAM_WORKBOOK,
-    *,
-    field_ids: Sequence[str] | None = None,
-    specific_csvs: List[Path] | None = None,
-) -> Path:
+def load_club_rows(path: Path, club_lookup: Dict[str, str]) -> Optional[Tuple[str, Sequence[dict[str, str]]]]:
+    rows = read_rows(path)
+    if not rows:
+        return None
+    return infer_club_name(path, rows, club_lookup), rows
+
+
+def _load_workbook_rows(specific_csvs: List[Path] | None) -> List[Tuple[str, Sequence[dict[str, str]]]]:
     if not CLUBS_DIR.exists():
         raise WorkflowError("No club CSVs available; run player fetch first.")
 
     club_lookup = load_club_names(CLUB_IDS_CSV)
-    club_rows: List[tuple[str, List[dict[str, str]]]] = []
+    club_rows: List[Tuple[str, Sequence[dict[str, str]]]] = []
 
     # Use specific CSVs if provided, otherwise fall back to all CSVs in directory
     csv_paths = specific_csvs if specific_csvs else list(iter_csv_files(CLUBS_DIR))
@@ -191,11 +216,22 @@ def build_team_workbook(
     for path in csv_paths:
         if not path.exists():
             continue
-        rows = read_rows(path)
-        if not rows:
-            continue
-        club_name = infer_club_name(path, rows, club_lookup)
-        club_rows.append((club_name, rows))
+        loaded = load_club_rows(path, club_lookup)
+        if loaded:
+            club_rows.append(loaded)
+    return club_rows
+
+
+def build_team_workbook(
+    output: Path = TEAM_WORKBOOK,
+    *,
+    field_ids: Sequence[str] | None = None,
+    specific_csvs: List[Path] | None = None,
+    club_rows: Sequence[Tuple[str, Sequence[dict[str, str]]]] | None = None,
+) -> Path:
+    # run_workflow loads each roster as soon as it is augmented and hands the rows over directly.
+    if club_rows is None:
+        club_rows = _load_workbook_rows(specific_csvs)
 
     if not club_rows:
         raise WorkflowError("No club data available to build workbook.")
@@ -214,18 +250,18 @@ def run_workflow(
     max_parallel_requests: Optional[int] = None,
     player_request_delay: float = 0.0,
     player_max_retries: Optional[int] = None,
+    fields_already_validated: bool = False,
 ) -> WorkflowResult:
     base = (base_url or get_api_base_url()).rstrip("/")
     team_details: List[Dict[str, str]] = []
 
-    def emit(message: str) -> None:
-        if logger:
-            logger(message)
-        else:
-            print(message)
+    emit: Callable[[str], None] = logger if logger is not None else print
 
-    selected_fields_list = list(selected_fields) if selected_fields else list(DEFAULT_FIELD_ORDER)
-    selected_fields_list = [field for field in selected_fields_list if field in AVAILABLE_FIELDS]
+    # The web API filters requested fields itself and says so, sparing a second pass here.
+    if selected_fields and fields_already_validated:
+        selected_fields_list = list(selected_fields)
+    else:
+        selected_fields_list = [field for field in selected_fields or () if field in AVAILABLE_FIELD_IDS]
     if not selected_fields_list:
         selected_fields_list = list(DEFAULT_FIELD_ORDER)
     team_ids_list = [club_id.strip() for club_id in team_ids if club_id and club_id.strip()]
@@ -298,9 +334,17 @@ def run_workflow(
     generated_csvs.extend(path for _, path in player_results)
 
     # Step 4: augment player CSVs
-    augmented_csvs: List[Path] = []
     emit("Step 4: augmenting player profiles")
-    for csv_path in generated_csvs:
+    # Club files are augmented concurrently, but share one pool of request slots and one pacer so the
+    # in-flight request cap and the delay between requests hold across all files.
+    request_slots = threading.BoundedSemaphore(player_worker_limit)
+    pacer = augment_player_profiles.RequestPacer(delay_seconds)
+    club_lookup = {detail["club_id"]: detail["club_name"] for detail in team_details}
+
+    def _augment_worker(
+        item: Tuple[int, Path],
+    ) -> Tuple[int, Tuple[Path, Optional[Tuple[str, Sequence[dict[str, str]]]]]]:
+        idx, csv_path = item
         emit(f"  Augmenting {csv_path.name}")
         augment_player_profiles.process_club_file(
             csv_path,
@@ -312,12 +356,27 @@ def run_workflow(
             base_url=base,
             logger=emit,
             max_workers=player_worker_limit,
+            request_slots=request_slots,
+            pacer=pacer,
         )
-        augmented_csvs.append(csv_path)
+        # Parse the finished roster here so it overlaps with other clubs' network I/O instead of
+        # running serially in Step 5.
+        return idx, (csv_path, load_club_rows(csv_path, club_lookup))
+
+    augment_results = _run_parallel_tasks(
+        list(enumerate(generated_csvs)),
+        _augment_worker,
+        emit=emit,
+        label="augmenting player profiles",
+        max_workers=parallel_workers,
+    )
+
+    augmented_csvs: List[Path] = [path for _, (path, _) in augment_results]
+    club_rows = [loaded for _, (_, loaded) in augment_results if loaded]
 
     # Step 5: build Excel workbook
     emit("Step 5: building Excel workbook")
-    workbook_path = build_team_workbook(field_ids=selected_fields_list, specific_csvs=augmented_csvs)
+    workbook_path = build_team_workbook(field_ids=selected_fields_list, club_rows=club_rows)
     emit(f"Workflow complete. Workbook saved to {workbook_path}")
 
     return WorkflowResult(
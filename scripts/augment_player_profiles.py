@@ -2,22 +2,33 @@
 """Augment club player CSVs with detailed player profile data.
 
 The script iterates over CSV files in a clubs directory, fetching each
-player's profile via the local API. Results are persisted incrementally after
-every successful profile so the process can resume if interrupted."""
+player's profile via the local API. Results are persisted incrementally every
+few successful profiles, and once more on exit or interruption, so the process
+can resume if interrupted. Fetched profiles are also cached on disk, so reruns
+only hit the API for players whose cached profile is missing or expired."""
 from __future__ import annotations
 
 import argparse
 import csv
+import itertools
 import json
 import os
 import random
 import tempfile
+import threading
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
 from pathlib import Path
 from typing import Any, Callable, Dict, Iterable, List
-from urllib.error import HTTPError, URLError
-from urllib.request import Request, ProxyHandler, build_opener, install_opener, urlopen
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speed-up
+    orjson = None
 
 DATA_DIR = Path(__file__).resolve().parent
 DEFAULT_CLUBS_DIR = DATA_DIR / "clubs"
@@ -26,6 +37,11 @@ DEFAULT_DELAY_SECONDS = 5.0
 DEFAULT_RETRIES = 3
 NON_RETRIABLE_STATUS = {400, 401, 403, 404, 422}
 PROXY_FILE = DATA_DIR / "proxy.txt"
+DEFAULT_CACHE_DIR = DATA_DIR / ".profile_cache"
+DEFAULT_CACHE_TTL_DAYS = 7.0
+REQUEST_TIMEOUT_SECONDS = 30
+PERSIST_EVERY = 5
+SESSION_POOL_SIZE = 32
 
 try:
     DEFAULT_MAX_WORKERS = max(1, int(os.environ.get("AUGMENT_MAX_WORKERS", "4")))
@@ -33,6 +49,30 @@ except ValueError:
     DEFAULT_MAX_WORKERS = 4
 
 
+def loads_json(data: str | bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def dumps_json(value: Any) -> str:
+    # Both encoders emit the same compact, non-ASCII-escaped form.
+    if orjson is not None:
+        return orjson.dumps(value).decode("utf-8")
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _build_session() -> requests.Session:
+    # One keep-alive pool for every profile request; retries stay in fetch_with_retry.
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=SESSION_POOL_SIZE, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["Accept"] = "application/json"
+    return session
+
+
+SESSION = _build_session()
+
+
 def iter_club_files(directory: Path) -> Iterable[Path]:
     return sorted(p for p in directory.glob("*.csv") if p.is_file())
 
@@ -40,22 +80,72 @@ def iter_club_files(directory: Path) -> Iterable[Path]:
 def read_rows(path: Path) -> tuple[List[Dict[str, str]], List[str]]:
     with path.open(newline="", encoding="utf-8") as fh:
         reader = csv.DictReader(fh)
-        return [dict(row) for row in reader], list(reader.fieldnames or [])
+        # Reading fieldnames consumes the header row, so do it before iterating; DictReader already
+        # yields a fresh dict per row, so the rows need no copying.
+        fieldnames = list(reader.fieldnames or [])
+        return list(reader), fieldnames
 
 
 def persist_rows(path: Path, rows: List[Dict[str, str]], fieldnames: List[str]) -> None:
+    # The rename keeps readers from ever seeing a half-written CSV. No fsync is issued: the file is
+    # derived data that a rerun can rebuild, so checkpoints cost one write and one rename.
     tmp_fd, tmp_path = tempfile.mkstemp(prefix=path.stem + "_", suffix=".tmp", dir=str(path.parent))
     try:
         with open(tmp_fd, "w", newline="", encoding="utf-8") as fh:
             writer = csv.DictWriter(fh, fieldnames=fieldnames)
             writer.writeheader()
             writer.writerows(rows)
-        Path(tmp_path).replace(path)
-    finally:
+        os.replace(tmp_path, path)
+    except BaseException:
+        # Only a failed write leaves the temporary file behind; after a successful replace it is gone.
         try:
-            Path(tmp_path).unlink(missing_ok=True)
+            os.unlink(tmp_path)
         except OSError:
             pass
+        raise
+
+
+def profile_cache_path(cache_dir: Path, player_id: str) -> Path | None:
+    # Only plain IDs are cached so a malformed CSV value can never escape the cache directory.
+    if not player_id.isalnum():
+        return None
+    return cache_dir / f"{player_id}.json"
+
+
+def load_cached_profile(cache_dir: Path, player_id: str, max_age: float | None) -> Dict[str, Any] | None:
+    cache_path = profile_cache_path(cache_dir, player_id)
+    if cache_path is None:
+        return None
+    try:
+        if max_age is not None and time.time() - cache_path.stat().st_mtime > max_age:
+            return None
+        data = loads_json(cache_path.read_bytes())
+    except (OSError, json.JSONDecodeError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def store_cached_profile(cache_dir: Path, player_id: str, profile: Dict[str, Any]) -> None:
+    cache_path = profile_cache_path(cache_dir, player_id)
+    if cache_path is None:
+        return
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_fd, tmp_path = tempfile.mkstemp(prefix=player_id + "_", suffix=".tmp", dir=str(cache_dir))
+        try:
+            with open(tmp_fd, "w", encoding="utf-8") as fh:
+                fh.write(dumps_json(profile))
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            # Only a failed write leaves the temporary file behind; after a successful replace it is gone.
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+    except OSError:
+        # The cache is an optimisation only; a failed write just means a refetch next time.
+        pass
 
 
 def load_proxies(path: Path) -> List[str]:
@@ -68,8 +158,19 @@ def load_proxies(path: Path) -> List[str]:
     return proxies
 
 
-def choose_proxy(proxies: List[str]) -> str:
-    return random.choice(proxies)
+class ProxyRotation:
+    """Hand out proxies round-robin, starting from a shuffled order."""
+
+    def __init__(self, proxies: List[str]) -> None:
+        self._proxies = tuple(random.sample(proxies, len(proxies)))
+        # next() on itertools.count is atomic, so worker threads can share one rotation without a lock.
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._proxies)
+
+    def next(self) -> str:
+        return self._proxies[next(self._counter) % len(self._proxies)]
 
 
 def build_profile_url(player_id: str, base_url: str | None = None) -> str:
@@ -79,18 +180,14 @@ def build_profile_url(player_id: str, base_url: str | None = None) -> str:
 
 def fetch_profile(player_id: str, proxy: str | None = None, *, base_url: str | None = None) -> Dict[str, Any]:
     url = build_profile_url(player_id, base_url)
-    request = Request(url, headers={"Accept": "application/json"})
+    proxy_map = {"http": proxy, "https": proxy} if proxy else None
+    response = SESSION.get(url, proxies=proxy_map, timeout=REQUEST_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    return loads_json(response.content)
 
-    if proxy:
-        handler = ProxyHandler({"http": proxy, "https": proxy})
-        opener = build_opener(handler)
-        install_opener(opener)
-    else:
-        install_opener(build_opener())
 
-    with urlopen(request) as response:
-        payload = response.read().decode("utf-8")
-    return json.loads(payload)
+def response_status(exc: requests.HTTPError) -> int | None:
+    return exc.response.status_code if exc.response is not None else None
 
 
 def fetch_with_retry(
@@ -98,16 +195,16 @@ def fetch_with_retry(
     *,
     retries: int,
     delay: float,
-    proxies: List[str] | None,
+    proxies: ProxyRotation | None,
     base_url: str | None,
 ) -> Dict[str, Any]:
     attempt = 1
     while True:
-        proxy = choose_proxy(proxies) if proxies else None
+        proxy = proxies.next() if proxies else None
         try:
             return fetch_profile(player_id, proxy=proxy, base_url=base_url)
-        except HTTPError as exc:
-            if exc.code in NON_RETRIABLE_STATUS:
+        except requests.HTTPError as exc:
+            if response_status(exc) in NON_RETRIABLE_STATUS:
                 raise
             if attempt >= retries:
                 raise
@@ -115,7 +212,7 @@ def fetch_with_retry(
             print(f"      Attempt {attempt}/{retries} failed ({exc}); retrying in {backoff:.1f}s")
             time.sleep(backoff)
             attempt += 1
-        except (URLError, json.JSONDecodeError) as exc:
+        except (requests.RequestException, json.JSONDecodeError) as exc:
             if attempt >= retries:
                 raise
             backoff = max(0.0, delay) * (2 ** (attempt - 1)) or 1.0
@@ -130,7 +227,7 @@ def serialise_value(value: Any) -> str:
     if isinstance(value, list):
         return ";".join(serialise_value(v) for v in value)
     if isinstance(value, dict):
-        return json.dumps(value, ensure_ascii=False)
+        return dumps_json(value)
     return str(value)
 
 
@@ -149,6 +246,26 @@ def determine_player_id(row: Dict[str, str]) -> str | None:
     return None
 
 
+class RequestPacer:
+    """Space request starts at least ``interval`` seconds apart across threads."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = max(0.0, interval)
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        # Reserve the next start slot under the lock, then sleep outside it.
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
 def _resolve_worker_count(total: int, requested: int | None) -> int:
     if total <= 0:
         return 0
@@ -164,16 +281,25 @@ def process_club_file(
     retries: int,
     force: bool,
     cooldown: float,
-    proxies: List[str] | None,
+    proxies: ProxyRotation | None,
     base_url: str | None = None,
     logger: Callable[[str], None] | None = None,
     max_workers: int | None = None,
+    request_slots: threading.Semaphore | None = None,
+    pacer: RequestPacer | None = None,
+    cache_dir: Path | None = None,
+    cache_ttl: float | None = None,
+    refresh_cache: bool = False,
 ) -> None:
-    def log(message: str) -> None:
-        if logger:
-            logger(message)
-        else:
-            print(message)
+    # Callers augmenting several files at once share request_slots and pacer, capping in-flight
+    # requests and keeping the delay between request starts across all files.
+    slot = request_slots if request_slots is not None else nullcontext()
+    if pacer is None:
+        pacer = RequestPacer(delay)
+
+    log: Callable[[str], None] = logger if logger is not None else print
+    # A forced or refreshing run never serves stored profiles but still records the fresh ones.
+    read_cache = cache_dir is not None and not (force or refresh_cache)
 
     rows, fieldnames = read_rows(path)
     if not rows:
@@ -193,67 +319,87 @@ def process_club_file(
         jobs.append((display_idx - 1, display_idx, player_id))
 
     if not jobs:
-        persist_rows(path, rows, ordered_fields)
+        # Nothing to fetch means nothing changes; leave the file untouched.
         return
 
     worker_count = _resolve_worker_count(len(jobs), max_workers)
     log(f"    Using up to {worker_count} parallel player workers")
 
+    # Rewriting the whole CSV after every profile costs O(rows) each time, so changed rows are
+    # checkpointed in batches and the remainder is flushed when the file is done or interrupted.
+    unsaved_rows = 0
+    known_fields = set(ordered_fields)
+
     def handle_success(row_index: int, flat_profile: Dict[str, str]) -> None:
-        nonlocal ordered_fields
+        nonlocal ordered_fields, unsaved_rows
         row = rows[row_index]
         row_changed = False
         for key, value in flat_profile.items():
-            if key not in ordered_fields:
+            if key not in known_fields:
+                known_fields.add(key)
                 ordered_fields.append(key)
             if row.get(key) != value:
                 row[key] = value
                 row_changed = True
         if row_changed:
-            persist_rows(path, rows, ordered_fields)
+            unsaved_rows += 1
+            if unsaved_rows >= PERSIST_EVERY:
+                persist_rows(path, rows, ordered_fields)
+                unsaved_rows = 0
 
     def process_job(job: tuple[int, int, str]) -> tuple[int, Dict[str, str] | None]:
         row_index, display_index, player_id = job
+        if read_cache:
+            cached = load_cached_profile(cache_dir, player_id, cache_ttl)
+            if cached is not None:
+                log(f"    Player {display_index}/{total_players}: using cached profile for {player_id}")
+                return row_index, flatten_profile(cached)
         log(f"    Player {display_index}/{total_players}: fetching profile for {player_id}")
         try:
-            profile = fetch_with_retry(
-                player_id,
-                retries=max(1, retries),
-                delay=max(0.0, delay),
-                proxies=proxies,
-                base_url=base_url,
-            )
-        except HTTPError as exc:
-            status = getattr(exc, "code", None)
+            with slot:
+                pacer.wait()
+                profile = fetch_with_retry(
+                    player_id,
+                    retries=max(1, retries),
+                    delay=max(0.0, delay),
+                    proxies=proxies,
+                    base_url=base_url,
+                )
+        except requests.HTTPError as exc:
+            status = response_status(exc)
             log(f"      Failed to fetch player {player_id}: {exc}")
             if status in {403, 429}:
                 sleep_for = max(delay, cooldown)
                 log(f"      Rate limit suspected; sleeping {sleep_for:.1f}s before continuing")
                 time.sleep(sleep_for)
             return row_index, None
-        except (URLError, json.JSONDecodeError, ValueError) as exc:
+        except (requests.RequestException, json.JSONDecodeError, ValueError) as exc:
             log(f"      Failed to process player {player_id}: {exc}")
             return row_index, None
         else:
+            if cache_dir is not None:
+                store_cached_profile(cache_dir, player_id, profile)
             flat = flatten_profile(profile)
             return row_index, flat
 
-    if worker_count <= 1:
-        for job in jobs:
-            row_index, flat_profile = process_job(job)
-            if flat_profile:
-                handle_success(row_index, flat_profile)
-            time.sleep(max(0.0, delay))
-    else:
-        with ThreadPoolExecutor(max_workers=worker_count) as executor:
-            futures = {executor.submit(process_job, job): job for job in jobs}
-            for future in as_completed(futures):
-                row_index, flat_profile = future.result()
+    try:
+        if worker_count <= 1:
+            for job in jobs:
+                row_index, flat_profile = process_job(job)
                 if flat_profile:
                     handle_success(row_index, flat_profile)
-                time.sleep(max(0.0, delay))
-
-    persist_rows(path, rows, ordered_fields)
+        else:
+            with ThreadPoolExecutor(max_workers=worker_count) as executor:
+                futures = {executor.submit(process_job, job): job for job in jobs}
+                for future in as_completed(futures):
+                    row_index, flat_profile = future.result()
+                    if flat_profile:
+                        handle_success(row_index, flat_profile)
+    finally:
+        # Header growth from newly seen profile keys only matters alongside a changed row, so a
+        # file whose rows are all saved (or never changed) is not rewritten.
+        if unsaved_rows:
+            persist_rows(path, rows, ordered_fields)
 
 
 def main() -> None:
@@ -268,10 +414,20 @@ def main() -> None:
                         help="Max retry attempts for transient failures (default: 3)")
     parser.add_argument("--max-workers", type=int, default=None,
                         help="Maximum concurrent player requests (default: env AUGMENT_MAX_WORKERS or 4)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of club files to process concurrently (default: 1)")
     parser.add_argument("--force", action="store_true",
-                        help="Fetch profiles even if profile columns already exist")
+                        help="Fetch profiles even if profile columns already exist; implies --refresh-cache")
     parser.add_argument("--cooldown", type=float, default=30.0,
                         help="Extra wait after rate-limit responses (default: 30)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Neither read nor write the profile cache")
+    parser.add_argument("--refresh-cache", action="store_true",
+                        help="Ignore cached profiles but store the fresh ones")
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR,
+                        help="Directory for cached profile responses (default: .profile_cache next to this script)")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_CACHE_TTL_DAYS,
+                        help="Days a cached profile stays valid; 0 disables expiry (default: 7)")
     parser.add_argument("--use-proxies", action="store_true",
                         help="Enable proxy rotation from proxy.txt")
     parser.add_argument("--proxy-file", default=str(PROXY_FILE),
@@ -283,9 +439,9 @@ def main() -> None:
     if not clubs_dir.exists():
         raise FileNotFoundError(f"Missing directory: {clubs_dir}")
 
-    proxies: List[str] | None = None
+    proxies: ProxyRotation | None = None
     if args.use_proxies:
-        proxies = load_proxies(Path(args.proxy_file))
+        proxies = ProxyRotation(load_proxies(Path(args.proxy_file)))
         print(f"Loaded {len(proxies)} proxies")
 
     club_files = list(iter_club_files(clubs_dir))
@@ -293,22 +449,55 @@ def main() -> None:
         print(f"No CSV files found in {clubs_dir}")
         return
 
-    for club_index, path in enumerate(club_files, start=1):
-        print(f"[{club_index}/{len(club_files)}] Processing {path.name}")
+    total_clubs = len(club_files)
+    club_workers = max(1, min(args.workers, total_clubs))
+    # All clubs share one pacer, so --delay spaces requests globally, and one slot pool, so
+    # --max-workers caps in-flight requests no matter how many clubs run at once.
+    pacer = RequestPacer(max(0.0, args.delay))
+    request_slots = threading.BoundedSemaphore(args.max_workers or DEFAULT_MAX_WORKERS) if club_workers > 1 else None
+    cache_dir = None if args.no_cache else args.cache_dir
+    cache_ttl = args.cache_ttl * 86400 if args.cache_ttl > 0 else None
+
+    def run_club(path: Path) -> None:
+        process_club_file(
+            path,
+            delay=max(0.0, args.delay),
+            retries=max(1, args.max_retries),
+            force=args.force,
+            cooldown=max(0.0, args.cooldown),
+            proxies=proxies,
+            base_url=api_base,
+            logger=None,
+            max_workers=args.max_workers,
+            request_slots=request_slots,
+            pacer=pacer,
+            cache_dir=cache_dir,
+            cache_ttl=cache_ttl,
+            refresh_cache=args.refresh_cache,
+        )
+
+    if club_workers == 1:
+        for club_index, path in enumerate(club_files, start=1):
+            print(f"[{club_index}/{total_clubs}] Processing {path.name}")
+            try:
+                run_club(path)
+            except KeyboardInterrupt:
+                print("Interrupted by user; latest progress persisted.")
+                raise
+        return
+
+    print(f"Processing {total_clubs} clubs with {club_workers} workers")
+    with ThreadPoolExecutor(max_workers=club_workers) as executor:
+        futures = {executor.submit(run_club, path): path for path in club_files}
         try:
-            process_club_file(
-                path,
-                delay=max(0.0, args.delay),
-                retries=max(1, args.max_retries),
-                force=args.force,
-                cooldown=max(0.0, args.cooldown),
-                proxies=proxies,
-                base_url=api_base,
-                logger=None,
-                max_workers=args.max_workers,
-            )
-        except KeyboardInterrupt:
-            print("Interrupted by user; latest progress persisted.")
+            for club_index, future in enumerate(as_completed(futures), start=1):
+                future.result()
+                print(f"[{club_index}/{total_clubs}] Finished {futures[future].name}")
+        except BaseException as exc:
+            # Let the clubs already running finish and persist, but don't start the rest.
+            executor.shutdown(wait=False, cancel_futures=True)
+            if isinstance(exc, KeyboardInterrupt):
+                print("Interrupted by user; latest progress persisted.")
             raise
 
 
@@ -6,19 +6,29 @@ import argparse
 import csv
 import json
 import re
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
 from datetime import datetime
+from functools import lru_cache
+from itertools import repeat
 from pathlib import Path
 from typing import Callable, Dict, Iterable, List, Sequence, Tuple
 
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font
 from openpyxl.utils import get_column_letter
 
+from augment_player_profiles import loads_json
+
 DATA_DIR = Path(__file__).resolve().parent.parent
 DEFAULT_CLUBS_DIR = DATA_DIR / "data" / "clubs"
 DEFAULT_CLUB_IDS_CSV = DATA_DIR / "data" / "club_ids.csv"
 DEFAULT_OUTPUT = DATA_DIR / "data" / "exports" / "team_list.xlsx"
-INVALID_SHEET_CHARS = re.compile(r"[\\/*?:\[\]]")
+# Characters Excel rejects in sheet names become spaces; apostrophes are dropped outright.
+SHEET_NAME_TRANSLATION = str.maketrans({**dict.fromkeys("\\/*?:[]", " "), "'": None})
+NATIONALITY_SEPARATORS = re.compile(r"[;,]")
+NON_DIGIT_CHARS = re.compile(r"\D")
 
 
 def load_club_names(path: Path) -> Dict[str, str]:
@@ -41,8 +51,7 @@ def iter_csv_files(directory: Path) -> Iterable[Path]:
 
 def read_rows(path: Path) -> Sequence[dict[str, str]]:
     with path.open(newline="", encoding="utf-8") as fh:
-        reader = csv.DictReader(fh)
-        return [dict(row) for row in reader]
+        return list(csv.DictReader(fh))
 
 
 def extract_club_id(rows: Sequence[dict[str, str]]) -> str | None:
@@ -51,14 +60,8 @@ def extract_club_id(rows: Sequence[dict[str, str]]) -> str | None:
         if direct:
             return direct
     for row in rows:
-        raw = (row.get("profile_club") or "").strip()
-        if not raw:
-            continue
-        try:
-            data = json.loads(raw)
-        except json.JSONDecodeError:
-            continue
-        if isinstance(data, dict):
+        data = parse_profile_club(row)
+        if data:
             club_id = data.get("id")
             if isinstance(club_id, str) and club_id.strip():
                 return club_id.strip()
@@ -77,14 +80,8 @@ def infer_club_name(file_path: Path, rows: Sequence[dict[str, str]], club_lookup
     if club_id:
         # Fall back to any name stored inside the JSON payload.
         for row in rows:
-            raw = (row.get("profile_club") or "").strip()
-            if not raw:
-                continue
-            try:
-                data = json.loads(raw)
-            except json.JSONDecodeError:
-                continue
-            name = data.get("name") if isinstance(data, dict) else None
+            data = parse_profile_club(row)
+            name = data.get("name") if data else None
             if isinstance(name, str) and name.strip():
                 return name.strip()
     for row in rows:
@@ -97,9 +94,7 @@ def infer_club_name(file_path: Path, rows: Sequence[dict[str, str]], club_lookup
 
 
 def sanitise_sheet_name(name: str, used: set[str]) -> str:
-    cleaned = INVALID_SHEET_CHARS.sub(" ", name)
-    cleaned = cleaned.replace("'", "")
-    cleaned = cleaned.strip()
+    cleaned = name.translate(SHEET_NAME_TRANSLATION).strip()
     if not cleaned:
         cleaned = "Team"
     cleaned = cleaned[:31]
@@ -113,6 +108,7 @@ def sanitise_sheet_name(name: str, used: set[str]) -> str:
     return cleaned
 
 
+@lru_cache(maxsize=4096)
 def split_name(full_name: str) -> tuple[str, str]:
     name = full_name.strip()
     if not name:
@@ -158,17 +154,24 @@ def parse_market_value(row: dict[str, str]) -> str:
     return first_non_empty(row, "marketValue", "profile_marketValue")
 
 
-def parse_profile_club(row: dict[str, str]) -> dict[str, str] | None:
-    raw = (row.get("profile_club") or "").strip()
-    if not raw:
-        return None
+@lru_cache(maxsize=4096)
+def _decode_profile_club(raw: str) -> dict[str, str] | None:
     try:
-        data = json.loads(raw)
+        data = loads_json(raw)
     except json.JSONDecodeError:
         return None
     return data if isinstance(data, dict) else None
 
 
+def parse_profile_club(row: dict[str, str]) -> dict[str, str] | None:
+    # Club inference and several field extractors read the same payload for every row,
+    # so each distinct JSON string is decoded once. Callers must not mutate the result.
+    raw = (row.get("profile_club") or "").strip()
+    if not raw:
+        return None
+    return _decode_profile_club(raw)
+
+
 def parse_joined_on(row: dict[str, str]) -> str:
     direct = first_non_empty(row, "joinedOn")
     if direct:
@@ -202,7 +205,7 @@ def parse_agent(row: dict[str, str]) -> str:
     if not raw:
         return ""
     try:
-        data = json.loads(raw)
+        data = loads_json(raw)
     except json.JSONDecodeError:
         return raw
     if isinstance(data, dict):
@@ -220,7 +223,7 @@ def parse_position(row: dict[str, str]) -> str:
     if not raw:
         return ""
     try:
-        data = json.loads(raw)
+        data = loads_json(raw)
     except json.JSONDecodeError:
         return raw
     if isinstance(data, dict):
@@ -232,13 +235,19 @@ def parse_position(row: dict[str, str]) -> str:
     return raw
 
 
-def parse_number(row: dict[str, str]) -> str:
-    number = (row.get("profile_shirtNumber") or row.get("shirtNumber") or "").strip()
+@lru_cache(maxsize=1024)
+def _clean_number(raw: str) -> str:
+    number = raw.strip()
     if number.startswith("#"):
         number = number[1:]
     return number
 
 
+def parse_number(row: dict[str, str]) -> str:
+    # Shirt numbers repeat across clubs and are read both for sorting and for the Number column.
+    return _clean_number(row.get("profile_shirtNumber") or row.get("shirtNumber") or "")
+
+
 def parse_birthday(row: dict[str, str]) -> str:
     for key in ("profile_dateOfBirth", "dateOfBirth"):
         value = row.get(key)
@@ -262,13 +271,13 @@ def parse_nationality(row: dict[str, str]) -> str:
         return ""
     if raw.startswith("[") and raw.endswith("]"):
         try:
-            data = json.loads(raw)
+            data = loads_json(raw)
         except json.JSONDecodeError:
             pass
         else:
             if isinstance(data, list):
                 return ", ".join(str(item) for item in data)
-    parts = [part.strip() for part in raw.replace(";", ",").split(",") if part.strip()]
+    parts = [part for part in (piece.strip() for piece in NATIONALITY_SEPARATORS.split(raw)) if part]
     return ", ".join(parts)
 
 
@@ -280,28 +289,21 @@ def parse_portrait(row: dict[str, str]) -> str:
     return ""
 
 
-def sort_key_for_row(row: dict[str, str]) -> Tuple[int, str]:
-    number = parse_number(row)
-    if number:
-        digits = ''.join(ch for ch in number if ch.isdigit())
-        if digits:
-            return int(digits), number
+@lru_cache(maxsize=1024)
+def _number_sort_key(number: str) -> Tuple[int, str]:
+    digits = NON_DIGIT_CHARS.sub("", number)
+    if digits:
+        return int(digits), number
     return float("inf"), number
 
 
-def autofit_worksheet(ws) -> None:
-    for column_cells in ws.columns:
-        max_length = 0
-        column = get_column_letter(column_cells[0].column)
-        for cell in column_cells:
-            value = cell.value
-            if value is None:
-                continue
-            text = str(value)
-            if len(text) > max_length:
-                max_length = len(text)
-        adjusted_width = max_length + 2
-        ws.column_dimensions[column].width = adjusted_width
+def sort_key_for_row(row: dict[str, str]) -> Tuple[int, str]:
+    return _number_sort_key(parse_number(row))
+
+
+def set_column_widths(ws, widths: Sequence[int]) -> None:
+    for index, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(index)].width = width + 2
 
 
 FIELD_DEFINITIONS: Dict[str, tuple[str, Callable[[dict[str, str]], str]]] = {
@@ -357,44 +359,74 @@ def resolve_fields(field_ids: Sequence[str] | None) -> List[tuple[str, Callable[
     return resolved
 
 
+def extract_sheet(
+    rows: Sequence[dict[str, str]],
+    field_ids: Sequence[str] | None = None,
+) -> tuple[List[List[str]], List[int]]:
+    # Sorts one roster and returns its cell values and column widths. It touches no openpyxl state,
+    # so build_workbook can run it in worker processes.
+    resolved_fields = resolve_fields(field_ids)
+    extractors = [extractor for _, extractor in resolved_fields]
+    # Column widths are tracked while the values are extracted, in the same pass.
+    widths = [0, *(len(label) for label, _ in resolved_fields)]
+    values: List[List[str]] = []
+    for row in sorted(rows, key=sort_key_for_row):
+        row_values = [""]
+        row_values.extend([extract(row) for extract in extractors])
+        widths = list(map(max, widths, map(len, row_values)))
+        values.append(row_values)
+    return values, widths
+
+
 def build_workbook(
     club_rows: List[tuple[str, Sequence[dict[str, str]]]],
     output_path: Path,
     *,
     field_ids: Sequence[str] | None = None,
+    workers: int = 1,
 ) -> None:
-    wb = Workbook()
-    team_sheet = wb.active
-    team_sheet.title = "Team List"
-    team_sheet.append(["", "Team"])
+    # Write-only workbooks stream rows out instead of keeping a cell object per value. Their column
+    # widths must be set before the first row is appended, so each sheet's values are extracted first.
+    wb = Workbook(write_only=True)
+    team_sheet = wb.create_sheet(title="Team List")
+    team_rows: List[List[str]] = [["", "Team"]]
+    team_name_width = len("Team")
 
     used_sheet_names = {"Team List"}
-    resolved_fields = resolve_fields(field_ids)
-
-    for team_name, rows in club_rows:
-        team_sheet.append(["", team_name])
+    header_labels = [label for label, _ in resolve_fields(field_ids)]
+    header_font = Font(bold=True)
+
+    rosters = [rows for _, rows in club_rows]
+    with ExitStack() as stack:
+        # Value extraction is pure Python and independent per club, so it can be spread over worker
+        # processes; openpyxl itself is only ever touched from this process, in club order.
+        if workers > 1 and len(rosters) > 1:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=min(workers, len(rosters))))
+            sheets = executor.map(extract_sheet, rosters, repeat(field_ids))
+        else:
+            sheets = map(extract_sheet, rosters, repeat(field_ids))
 
-        sheet_name = sanitise_sheet_name(team_name, used_sheet_names)
-        ws = wb.create_sheet(title=sheet_name)
-        headers = [(label, Font(bold=True)) for label, _ in resolved_fields]
-        ws.append(["", *(label for label, _ in headers)])
-        for cell, (_, font) in zip(ws[1][1:], headers):
-            cell.font = font
+        for (team_name, _), (values, widths) in zip(club_rows, sheets):
+            team_rows.append(["", team_name])
+            team_name_width = max(team_name_width, len(team_name))
 
-        sorted_rows = sorted(rows, key=sort_key_for_row)
+            sheet_name = sanitise_sheet_name(team_name, used_sheet_names)
+            ws = wb.create_sheet(title=sheet_name)
+            set_column_widths(ws, widths)
 
-        for row in sorted_rows:
-            ws.append([
-                "",
-                *(
-                    extractor(row)
-                    for _, extractor in resolved_fields
-                ),
-            ])
+            header: List[object] = [""]
+            for label in header_labels:
+                cell = WriteOnlyCell(ws, value=label)
+                cell.font = header_font
+                header.append(cell)
+            ws.append(header)
+            for row_values in values:
+                ws.append(row_values)
 
-        autofit_worksheet(ws)
+    set_column_widths(team_sheet, [0, team_name_width])
+    for row_values in team_rows:
+        team_sheet.append(row_values)
 
-    autofit_worksheet(team_sheet)
     output_path.parent.mkdir(parents=True, exist_ok=True)
     wb.save(output_path)
 
@@ -411,6 +443,8 @@ def main() -> None:
                         help=f"Optional ordered list of field IDs to include (available: {', '.join(sorted(get_available_fields()))})")
     parser.add_argument("--specific-csvs", nargs="+", type=Path, default=None,
                         help="Process only specific CSV files instead of all files in clubs-dir")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for extracting sheet values; useful for many large clubs (default: 1)")
     args = parser.parse_args()
 
     club_lookup = load_club_names(args.club_ids)
@@ -441,7 +475,7 @@ def main() -> None:
         print("No club data available")
         return
 
-    build_workbook(club_rows, args.output, field_ids=args.fields)
+    build_workbook(club_rows, args.output, field_ids=args.fields, workers=args.workers)
     print(f"Workbook saved to {args.output}")
 
 
@@ -7,13 +7,21 @@ from __future__ import annotations
 
 import argparse
 import csv
+import hashlib
 import json
-import time
+import os
+import random
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Sequence
-from urllib.error import HTTPError, URLError
-from urllib.parse import urlencode
-from urllib.request import Request, urlopen
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from augment_player_profiles import RequestPacer, dumps_json, loads_json
 
 DATA_DIR = Path(__file__).resolve().parent
 CLUB_IDS_CSV = DATA_DIR / "club_ids.csv"
@@ -21,44 +29,131 @@ OUTPUT_DIR = DATA_DIR / "clubs"
 BASE_URL = "http://localhost:8000/clubs/{club_id}/players"
 DEFAULT_DELAY_SECONDS = 5.0
 DEFAULT_RETRIES = 3
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+REQUEST_TIMEOUT_SECONDS = 30
+DEFAULT_WORKERS = 4
+CACHE_DIR = DATA_DIR / ".cache"
+# \w matches exactly the str.isalnum() characters plus "_", so non-ASCII letters survive.
+UNSAFE_FILENAME_CHARS = re.compile(r"[^\w-]")
 
 
-def load_club_rows(path: Path) -> List[Dict[str, str]]:
-    if not path.exists():
-        raise FileNotFoundError(f"Missing club IDs file: {path}")
-    with path.open(newline="", encoding="utf-8") as fh:
-        reader = csv.DictReader(fh)
-        rows = list(reader)
-    if not rows:
-        raise ValueError("club_ids.csv has no data rows")
-    if "club_id" not in rows[0]:
-        raise ValueError("club_ids.csv missing 'club_id' column header")
-    return rows
+class ResponseCache:
+    """Raw API response bodies stored on disk, keyed by a hash of the request."""
 
+    def __init__(self, directory: Path, *, refresh: bool = False) -> None:
+        self.directory = directory
+        # A refreshing cache never serves stored bodies but still records the new responses.
+        self.refresh = refresh
 
-def fetch_players(club_id: str, season_id: str | None) -> Any:
-    query = ""
-    if season_id:
-        query = "?" + urlencode({"season_id": season_id})
-    url = BASE_URL.format(club_id=club_id) + query
-    request = Request(url, headers={"Accept": "application/json"})
-    with urlopen(request) as response:
-        payload = response.read().decode("utf-8")
-    return json.loads(payload)
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.json"
 
+    def get(self, key: str) -> bytes | None:
+        if self.refresh:
+            return None
+        try:
+            return self._path(key).read_bytes()
+        except OSError:
+            return None
 
-def fetch_with_retry(club_id: str, season_id: str | None, *, retries: int, delay: float) -> Any:
-    attempt = 0
-    while True:
-        attempt += 1
+    def put(self, key: str, data: bytes) -> None:
         try:
-            return fetch_players(club_id, season_id)
-        except (HTTPError, URLError, json.JSONDecodeError) as exc:
-            if attempt > retries:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=str(self.directory))
+            try:
+                with open(tmp_fd, "wb") as fh:
+                    fh.write(data)
+                os.replace(tmp_path, self._path(key))
+            except BaseException:
+                os.unlink(tmp_path)
                 raise
-            backoff = delay * (2 ** (attempt - 1))
-            print(f"    Attempt {attempt}/{retries} failed ({exc}); retrying in {backoff:.1f}s")
-            time.sleep(backoff)
+        except OSError:
+            # The cache only saves requests on later runs; failing to write it is not an error.
+            pass
+
+
+def mount_adapter(session: requests.Session, max_retries: Retry | int = 0) -> None:
+    # One keep-alive connection pool for every request; the adapter also owns the retry policy.
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=max_retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+
+class BackoffRetry(Retry):
+    """Retry policy whose first retry also waits ``backoff_factor`` seconds."""
+
+    def get_backoff_time(self) -> float:
+        # urllib3 retries the first failure immediately; keep the delay, 2*delay, 4*delay... schedule.
+        backoff = super().get_backoff_time()
+        if backoff or not self.history or not self.backoff_factor:
+            return backoff
+        return float(min(self.backoff_max, self.backoff_factor + random.random() * self.backoff_jitter))
+
+
+def build_retry(attempts: int, delay: float) -> Retry:
+    # Exponential backoff with jitter so concurrent workers do not retry in lockstep;
+    # 429/5xx are retried (honouring Retry-After), other 4xx fail at once.
+    return BackoffRetry(
+        total=max(0, attempts - 1),
+        backoff_factor=delay,
+        backoff_jitter=delay * 0.5,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    mount_adapter(session)
+    session.headers["Accept"] = "application/json"
+    return session
+
+
+SESSION = _build_session()
+
+
+def load_club_rows(path: Path) -> Tuple[List[List[str]], Dict[str, int]]:
+    if not path.exists():
+        raise FileNotFoundError(f"Missing club IDs file: {path}")
+    with path.open(newline="", encoding="utf-8") as fh:
+        reader = csv.reader(fh)
+        header = next(reader, [])
+        width = len(header)
+        # Short rows are padded so every header column can be indexed; blank lines are skipped.
+        rows = [row + [""] * (width - len(row)) if len(row) < width else row for row in reader if row]
+    if not rows:
+        raise ValueError("club_ids.csv has no data rows")
+    columns = {name: index for index, name in enumerate(header)}
+    if "club_id" not in columns:
+        raise ValueError("club_ids.csv missing 'club_id' column header")
+    return rows, columns
+
+
+def fetch_players(
+    club_id: str,
+    season_id: str | None,
+    cache: ResponseCache | None = None,
+    pacer: RequestPacer | None = None,
+) -> Any:
+    cache_key = f"players:{club_id}:{season_id or ''}"
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return loads_json(cached)
+    # Only real requests are paced; cached bodies are served immediately.
+    if pacer is not None:
+        pacer.wait()
+    url = BASE_URL.format(club_id=club_id)
+    params = {"season_id": season_id} if season_id else None
+    response = SESSION.get(url, params=params, timeout=REQUEST_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    payload = loads_json(response.content)
+    # Only bodies that decoded cleanly are cached.
+    if cache is not None:
+        cache.put(cache_key, response.content)
+    return payload
 
 
 def extract_players_payload(payload: Any, club_id: str) -> dict[str, Any]:
@@ -77,51 +172,59 @@ def extract_players_payload(payload: Any, club_id: str) -> dict[str, Any]:
 
 
 def normalise_fieldnames(players: Iterable[Any]) -> List[str]:
-    fieldnames: List[str] = []
-    seen = set()
+    # Dict keys keep first-seen order, so the union of player keys needs no separate seen set.
+    ordered: Dict[str, None] = {}
     for player in players:
         if isinstance(player, dict):
-            for key in player.keys():
-                if key not in seen:
-                    fieldnames.append(key)
-                    seen.add(key)
+            ordered.update(dict.fromkeys(player))
         else:
-            if "value" not in seen:
-                fieldnames.append("value")
-                seen.add("value")
-    if not fieldnames:
-        fieldnames.append("player")
-    return fieldnames
+            ordered.setdefault("value")
+    return list(ordered) or ["player"]
 
 
 def sanitise_filename(name: str) -> str:
-    safe = "".join(ch if ch.isalnum() or ch in ("-", "_") else "_" for ch in name.strip())
+    safe = UNSAFE_FILENAME_CHARS.sub("_", name.strip())
     safe = safe.strip("_")
     return safe.lower() or "club"
 
 
 def serialise_value(value: Any) -> str:
-    if isinstance(value, (str, int, float)) or value is None:
-        return "" if value is None else str(value)
-    if isinstance(value, list):
+    # Exact type checks: JSON payloads only produce these builtins, and strings are the common case.
+    value_type = type(value)
+    if value_type is str:
+        return value
+    if value is None:
+        return ""
+    if value_type is int or value_type is float:
+        return str(value)
+    if value_type is list:
         return ";".join(serialise_value(v) for v in value)
-    if isinstance(value, dict):
-        return json.dumps(value, ensure_ascii=False)
+    if value_type is dict:
+        return dumps_json(value)
     return str(value)
 
 
-def existing_csv_for_club(club_id: str, club_name: str | None) -> Path | None:
+def list_existing_csvs() -> Dict[str, Path]:
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    direct = OUTPUT_DIR / f"{club_id}.csv"
-    if direct.exists():
+    with os.scandir(OUTPUT_DIR) as entries:
+        return {
+            entry.name: Path(entry.path)
+            for entry in entries
+            if entry.name.endswith(".csv") and not entry.name.startswith(".") and entry.is_file()
+        }
+
+
+def existing_csv_for_club(existing: Dict[str, Path], club_id: str, club_name: str | None) -> Path | None:
+    direct = existing.get(f"{club_id}.csv")
+    if direct is not None:
         return direct
     if club_name:
         base = sanitise_filename(club_name)
-        for candidate in OUTPUT_DIR.glob(f"{base}*.csv"):
-            if candidate.is_file():
+        for name, candidate in existing.items():
+            if name.startswith(base):
                 return candidate
-    matches = sorted(OUTPUT_DIR.glob(f"*{club_id}*.csv"))
-    return matches[0] if matches else None
+    matches = sorted(name for name in existing if club_id in name)
+    return existing[matches[0]] if matches else None
 
 
 def write_players_csv(club_name: str, players: Sequence[Any]) -> Path:
@@ -130,14 +233,17 @@ def write_players_csv(club_name: str, players: Sequence[Any]) -> Path:
     target = OUTPUT_DIR / f"{filename}.csv"
 
     fieldnames = normalise_fieldnames(players)
+    # Rows are written positionally in header order; non-dict players fill only the first column.
+    blank_tail = [""] * (len(fieldnames) - 1)
     with target.open("w", newline="", encoding="utf-8") as fh:
-        writer = csv.DictWriter(fh, fieldnames=fieldnames)
-        writer.writeheader()
+        writer = csv.writer(fh, lineterminator="\n")
+        writer.writerow(fieldnames)
         for player in players:
             if isinstance(player, dict):
-                writer.writerow({key: serialise_value(player.get(key)) for key in fieldnames})
+                get = player.get
+                writer.writerow([serialise_value(get(key)) for key in fieldnames])
             else:
-                writer.writerow({fieldnames[0]: serialise_value(player)})
+                writer.writerow([serialise_value(player), *blank_tail])
     return target
 
 
@@ -147,42 +253,69 @@ def main() -> None:
     parser.add_argument("--delay", type=float, default=DEFAULT_DELAY_SECONDS,
                         help="Base seconds to wait between requests (default: 5)")
     parser.add_argument("--max-retries", type=int, default=DEFAULT_RETRIES,
-                        help="Number of retry attempts on failure (default: 3)")
+                        help="Maximum attempts per club (default: 3)")
     parser.add_argument("--force", action="store_true",
-                        help="Fetch even if a CSV already exists")
+                        help="Fetch even if a CSV already exists; implies --refresh-cache")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Maximum clubs fetched concurrently; --delay still spaces request starts (default: 4)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Neither read nor write the on-disk response cache")
+    parser.add_argument("--refresh-cache", action="store_true",
+                        help="Ignore cached responses but store the fresh ones")
     args = parser.parse_args()
 
-    rows = load_club_rows(CLUB_IDS_CSV)
+    rows, columns = load_club_rows(CLUB_IDS_CSV)
     total = len(rows)
-
-    for index, row in enumerate(rows, start=1):
-        club_id = row.get("club_id", "").strip()
-        club_name_hint = row.get("club_name", "").strip()
+    id_column = columns["club_id"]
+    name_column = columns.get("club_name")
+    clubs = [
+        (row[id_column].strip(), row[name_column].strip() if name_column is not None else "")
+        for row in rows
+    ]
+
+    # One directory listing serves every club lookup; nothing is written until all clubs are checked.
+    existing_csvs = list_existing_csvs()
+    pending: List[tuple[int, str]] = []
+    for index, (club_id, club_name_hint) in enumerate(clubs, start=1):
         if not club_id:
             continue
-        existing = existing_csv_for_club(club_id, club_name_hint or None)
+        existing = existing_csv_for_club(existing_csvs, club_id, club_name_hint or None)
         if existing and not args.force:
             print(f"[{index}/{total}] Skipping club {club_id}; CSV already exists ({existing.name})")
             continue
+        pending.append((index, club_id))
+    if not pending:
+        return
 
+    mount_adapter(SESSION, build_retry(max(1, args.max_retries), max(0.0, args.delay)))
+    pacer = RequestPacer(max(0.0, args.delay))
+    # A forced fetch wants current data, so stored bodies are not served (fresh ones are still stored).
+    cache = None if args.no_cache else ResponseCache(CACHE_DIR, refresh=args.refresh_cache or args.force)
+
+    def fetch_club(index: int, club_id: str) -> Any:
         print(f"[{index}/{total}] Fetching club {club_id}…", flush=True)
+        return fetch_players(club_id, args.season_id, cache, pacer)
+
+    # Requests run on worker threads; parsing and CSV writes stay on this thread as results arrive.
+    with ThreadPoolExecutor(max_workers=max(1, min(args.workers, len(pending)))) as executor:
+        futures = {executor.submit(fetch_club, index, club_id): club_id for index, club_id in pending}
         try:
-            raw_payload = fetch_with_retry(
-                club_id,
-                args.season_id,
-                retries=max(1, args.max_retries),
-                delay=max(0.0, args.delay),
-            )
-            parsed = extract_players_payload(raw_payload, club_id)
-            target = write_players_csv(parsed["club_name"], parsed["players"])
-            print(f"    Saved {target}")
-        except (HTTPError, URLError) as exc:
-            print(f"    Failed to fetch club {club_id}: {exc}")
-        except (json.JSONDecodeError, ValueError, KeyError) as exc:
-            print(f"    Failed to process club {club_id}: {exc}")
-
-        if index < total:
-            time.sleep(max(0.0, args.delay))
+            for future in as_completed(futures):
+                club_id = futures[future]
+                try:
+                    parsed = extract_players_payload(future.result(), club_id)
+                    target = write_players_csv(parsed["club_name"], parsed["players"])
+                    print(f"    Saved {target}")
+                except requests.RequestException as exc:
+                    print(f"    Failed to fetch club {club_id}: {exc}")
+                except (json.JSONDecodeError, ValueError, KeyError) as exc:
+                    print(f"    Failed to process club {club_id}: {exc}")
+        except BaseException as exc:
+            # Don't start the queued clubs; saved CSVs are skipped on the next run.
+            executor.shutdown(wait=False, cancel_futures=True)
+            if isinstance(exc, KeyboardInterrupt):
+                print("Interrupted by user; clubs saved so far are kept.")
+            raise
 
 
 if __name__ == "__main__":
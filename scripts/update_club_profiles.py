@@ -5,11 +5,16 @@ from __future__ import annotations
 import argparse
 import csv
 import json
-import time
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Any, Dict, List, Tuple
-from urllib.error import HTTPError, URLError
-from urllib.request import Request, urlopen
+
+import requests
+
+from augment_player_profiles import RequestPacer, loads_json
+from fetch_players import SESSION, ResponseCache, build_retry, mount_adapter
 
 DATA_DIR = Path(__file__).resolve().parent
 CLUB_IDS_CSV = DATA_DIR / "club_ids.csv"
@@ -17,45 +22,54 @@ PLAYERS_DIR = DATA_DIR / "clubs"
 PROFILE_URL = "http://localhost:8000/clubs/{club_id}/profile"
 DEFAULT_DELAY_SECONDS = 5.0
 DEFAULT_RETRIES = 3
+REQUEST_TIMEOUT_SECONDS = 30
+DEFAULT_WORKERS = 4
+PERSIST_EVERY = 20
+CACHE_DIR = DATA_DIR / ".cache"
 
-def load_club_rows(path: Path) -> Tuple[List[Dict[str, str]], List[str]]:
+
+def load_club_rows(path: Path) -> Tuple[List[List[str]], Dict[str, int]]:
     if not path.exists():
         raise FileNotFoundError(f"Missing club IDs file: {path}")
     with path.open(newline="", encoding="utf-8") as fh:
-        reader = csv.DictReader(fh)
-        rows = [dict(row) for row in reader]
-        fieldnames = list(reader.fieldnames or [])
+        reader = csv.reader(fh)
+        header = next(reader, [])
+        width = len(header)
+        # Short rows are padded so every header column can be indexed; blank lines are skipped.
+        rows = [row + [""] * (width - len(row)) if len(row) < width else row for row in reader if row]
     if not rows:
         raise ValueError("club_ids.csv has no data rows")
-    if "club_id" not in fieldnames:
+    columns = {name: index for index, name in enumerate(header)}
+    if "club_id" not in columns:
         raise ValueError("club_ids.csv missing 'club_id' column header")
-    if "club_name" not in fieldnames:
-        fieldnames.append("club_name")
+    if "club_name" not in columns:
+        columns["club_name"] = width
         for row in rows:
-            row.setdefault("club_name", "")
-    return rows, fieldnames
-
-
-def fetch_club_profile(club_id: str) -> Dict[str, Any]:
+            row[width:] = [""]
+    return rows, columns
+
+
+def fetch_club_profile(
+    club_id: str,
+    cache: ResponseCache | None = None,
+    pacer: RequestPacer | None = None,
+) -> Dict[str, Any]:
+    cache_key = f"profile:{club_id}"
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return loads_json(cached)
+    # Only real requests are paced; cached bodies are served immediately.
+    if pacer is not None:
+        pacer.wait()
     url = PROFILE_URL.format(club_id=club_id)
-    request = Request(url, headers={"Accept": "application/json"})
-    with urlopen(request) as response:
-        payload = response.read().decode("utf-8")
-    return json.loads(payload)
-
-
-def fetch_with_retry(club_id: str, *, retries: int, delay: float) -> Dict[str, Any]:
-    attempt = 1
-    while True:
-        try:
-            return fetch_club_profile(club_id)
-        except (HTTPError, URLError, json.JSONDecodeError) as exc:
-            if attempt >= retries:
-                raise
-            backoff = max(0.0, delay) * (2 ** (attempt - 1)) or 1.0
-            print(f"    Attempt {attempt}/{retries} failed ({exc}); retrying in {backoff:.1f}s")
-            time.sleep(backoff)
-            attempt += 1
+    response = SESSION.get(url, timeout=REQUEST_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    profile = loads_json(response.content)
+    # Only bodies that decoded cleanly are cached.
+    if cache is not None:
+        cache.put(cache_key, response.content)
+    return profile
 
 
 def extract_club_name(profile: Dict[str, Any], club_id: str) -> str:
@@ -66,22 +80,31 @@ def extract_club_name(profile: Dict[str, Any], club_id: str) -> str:
     return club_id
 
 
-def update_club_ids_csv(rows: List[Dict[str, str]], fieldnames: List[str], names: Dict[str, str]) -> None:
-    if "club_name" not in fieldnames:
-        fieldnames = fieldnames + ["club_name"]
+def update_club_ids_csv(rows: List[List[str]], columns: Dict[str, int], names: Dict[str, str]) -> None:
+    id_column = columns["club_id"]
+    name_column = columns["club_name"]
     for row in rows:
-        club_id = row.get("club_id", "").strip()
+        club_id = row[id_column].strip()
         if not club_id:
             continue
         new_name = names.get(club_id)
         if new_name:
-            row["club_name"] = new_name
-        else:
-            row.setdefault("club_name", row.get("club_name", ""))
-    with CLUB_IDS_CSV.open("w", newline="", encoding="utf-8") as fh:
-        writer = csv.DictWriter(fh, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
+            row[name_column] = new_name
+    # Written beside the original and renamed over it, so an interrupted run never leaves a truncated
+    # club_ids.csv that the next load_club_rows would reject.
+    tmp_fd, tmp_path = tempfile.mkstemp(prefix=CLUB_IDS_CSV.stem + "_", suffix=".tmp", dir=str(CLUB_IDS_CSV.parent))
+    try:
+        with open(tmp_fd, "w", newline="", encoding="utf-8") as fh:
+            writer = csv.writer(fh, lineterminator="\n")
+            writer.writerow(list(columns))
+            writer.writerows(rows)
+        os.replace(tmp_path, CLUB_IDS_CSV)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
 
 
 def main() -> None:
@@ -91,45 +114,71 @@ def main() -> None:
     parser.add_argument("--max-retries", type=int, default=DEFAULT_RETRIES,
                         help="Maximum attempts per club (default: 3)")
     parser.add_argument("--force", action="store_true",
-                        help="Fetch profiles even if a club name is already present")
+                        help="Fetch profiles even if a club name is already present; implies --refresh-cache")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Maximum clubs fetched concurrently; --delay still spaces request starts (default: 4)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Neither read nor write the on-disk response cache")
+    parser.add_argument("--refresh-cache", action="store_true",
+                        help="Ignore cached responses but store the fresh ones")
     args = parser.parse_args()
 
     if not PLAYERS_DIR.exists():
         raise FileNotFoundError(f"Missing players directory: {PLAYERS_DIR}")
 
-    rows, fieldnames = load_club_rows(CLUB_IDS_CSV)
+    rows, columns = load_club_rows(CLUB_IDS_CSV)
     club_names: Dict[str, str] = {}
     total = len(rows)
+    id_column = columns["club_id"]
+    name_column = columns["club_name"]
+    clubs = [(row[id_column].strip(), row[name_column].strip()) for row in rows]
 
-    for index, row in enumerate(rows, start=1):
-        club_id = row.get("club_id", "").strip()
+    pending: List[tuple[int, str]] = []
+    for index, (club_id, existing_name) in enumerate(clubs, start=1):
         if not club_id:
             continue
 
-        existing_name = row.get("club_name", "").strip()
         need_fetch = args.force or not existing_name
         if not need_fetch:
             print(f"[{index}/{total}] Skipping club {club_id}; club name already recorded")
             continue
+        pending.append((index, club_id))
+
+    mount_adapter(SESSION, build_retry(max(1, args.max_retries), max(0.0, args.delay)))
+    pacer = RequestPacer(max(0.0, args.delay))
+    # A forced fetch wants current names, so stored bodies are not served (fresh ones are still stored).
+    cache = None if args.no_cache else ResponseCache(CACHE_DIR, refresh=args.refresh_cache or args.force)
 
+    def fetch_club(index: int, club_id: str) -> Dict[str, Any]:
         print(f"[{index}/{total}] Fetching profile for club {club_id}…", flush=True)
-        try:
-            profile = fetch_with_retry(
-                club_id,
-                retries=max(1, args.max_retries),
-                delay=max(0.0, args.delay),
-            )
-            club_name = extract_club_name(profile, club_id)
-            club_names[club_id] = club_name
-        except (HTTPError, URLError) as exc:
-            print(f"    Failed to fetch profile for club {club_id}: {exc}")
-        except (json.JSONDecodeError, ValueError) as exc:
-            print(f"    Failed to process profile for club {club_id}: {exc}")
-
-        if index < total:
-            time.sleep(max(0.0, args.delay))
-
-    update_club_ids_csv(rows, fieldnames, club_names)
+        return fetch_club_profile(club_id, cache, pacer)
+
+    if pending:
+        # Requests run on worker threads; names are collected here and checkpointed to the CSV every
+        # PERSIST_EVERY clubs, so an interrupted run skips the recorded clubs when it is restarted.
+        with ThreadPoolExecutor(max_workers=max(1, min(args.workers, len(pending)))) as executor:
+            futures = {executor.submit(fetch_club, index, club_id): club_id for index, club_id in pending}
+            try:
+                for future in as_completed(futures):
+                    club_id = futures[future]
+                    try:
+                        club_names[club_id] = extract_club_name(future.result(), club_id)
+                    except requests.RequestException as exc:
+                        print(f"    Failed to fetch profile for club {club_id}: {exc}")
+                        continue
+                    except (json.JSONDecodeError, ValueError) as exc:
+                        print(f"    Failed to process profile for club {club_id}: {exc}")
+                        continue
+                    if len(club_names) % PERSIST_EVERY == 0:
+                        update_club_ids_csv(rows, columns, club_names)
+            except KeyboardInterrupt:
+                executor.shutdown(wait=False, cancel_futures=True)
+                if club_names:
+                    update_club_ids_csv(rows, columns, club_names)
+                print("Interrupted by user; fetched club names saved.")
+                raise
+
+    update_club_ids_csv(rows, columns, club_names)
     print(f"Updated {CLUB_IDS_CSV} with club names")
 
 